@@ -1,67 +1,169 @@
 # 语句查询及组织回答
+import os
+import threading
+from contextlib import contextmanager
+from math import isnan
 from operator import truediv, sub
 
-from py2neo import Graph
-
 from lib.utils import sign, debug
 from lib.result import Result
 from lib.answer import Answer, AnswerBuilder
 from lib.painter import Painter
 from lib.formatter import Formatter
-from lib.chain import TranslationChain
+from lib.chain import Cypher, TranslationChain
+from lib.cache import LRUCache
+from lib.trace import tracer
 
-from const import URI, USERNAME, PASSWORD, CHART_RENDER_DIR
+from graph_backend import GraphBackend, make_graph
+from const import CHART_RENDER_DIR, CUBE_PATH, QUERY_CACHE_SIZE
 
 
 class AnswerSearcher:
 
-    def __init__(self):
-        self.graph = Graph(URI, auth=(USERNAME, PASSWORD))
+    # 存在值立方时由其回答、不查询图的问题类型
+    cube_types = ('indexes_g_compare', 'areas_g_compare', 'indexes_trend', 'areas_trend', 'indexes_max', 'areas_max')
+
+    def __init__(self, graph: GraphBackend = None, cube=None):
+        self.graph = graph if graph is not None else make_graph()
+        # 值立方存在时，多年份与同比的值直接由其切片得到。
+        # 传入的值立方固定使用；否则在首次使用时载入，图重新构建或文件更新后重新载入
+        self._cube = cube
+        self._cube_pinned = cube is not None
+        self._cube_key = None  # (图的构建版本, 文件的修改时刻)
+        self._cube_lock = threading.Lock()
         self.painter = Painter()
+        # 查询结果缓存：Cypher.key: 结果行，图重新构建后失效
+        self.query_cache = LRUCache(QUERY_CACHE_SIZE)
+        # 批量问答中当前线程预取的结果行：Cypher.key: 结果行，该批回答完之前一直保留，不受缓存容量的影响
+        self._local = threading.local()
+
+    @property
+    def cube(self):
+        """ 值立方（ValueCube），不可用时为None，此时由图查询回答。
+            文件无法载入，或其中的构建版本与图的当前版本不同（尚未重新导出）时视为不可用，与图的回答保持一致。
+            载入需要numpy，只回答单年份问题时不必载入。
+        """
+        if self._cube_pinned:
+            return self._cube
+        try:
+            mtime = os.stat(CUBE_PATH).st_mtime_ns
+        except OSError:
+            mtime = None
+        key = (self.graph.version(), mtime)
+        if key != self._cube_key:
+            with self._cube_lock:
+                if key != self._cube_key:
+                    cube = None
+                    if mtime is not None:
+                        from lib.cube import ValueCube
+
+                        try:
+                            cube = ValueCube.load(CUBE_PATH)
+                        except Exception as err:  # 文件损坏或不兼容（如由其他版本的numpy导出），反序列化可能抛出各种异常
+                            debug('||CUBE LOAD FAILED||', f'{type(err).__name__}: {err}')
+                        else:
+                            if cube.version != key[0]:
+                                debug('||CUBE OUTDATED||', cube.version, '!=', key[0])
+                                cube = None
+                    self._cube, self._cube_key = cube, key
+        return self._cube
 
+    @tracer.traced('search')
     def search(self, result: Result) -> [Answer]:
         debug('||QUESTION ORIGINAL||', result.raw_question)
         debug('||QUESTION FILTERED||', result.filtered_question)
         answers = []
         for qt, chain in result.sqls.items():
-            answer = self.organize(qt, chain, result)
+            with tracer.span('organize', labels={'qt': qt}):
+                answer = self.organize(qt, chain, result)
             answers.append(answer)
         return answers
 
+    def prefetch(self, results: [Result]) -> dict:
+        """ 将多个问题第一层的查询合并去重后一并执行，返回{Cypher.key: 结果行}，供prefetched使用 """
+        sqls = []
+        for result in results:
+            for qt, chain in result.sqls.items():
+                if qt not in self.cube_types or self.cube is None:
+                    sqls.extend(chain.leaves())
+        if not sqls:
+            return {}
+        return {sql.key: rs for sql, rs in zip(sqls, self._run_many(sqls))}
+
+    @contextmanager
+    def prefetched(self, rows: dict):
+        """ 在此期间当前线程的查询先取自预取的结果行，之后的search直接命中 """
+        self._local.prefetched = rows
+        try:
+            yield
+        finally:
+            self._local.prefetched = None
+
+    @staticmethod
+    def _format(rs: list):
+        """ 将查询的结果行转为Formatter """
+        if len(rs) > 1:
+            return [Formatter(r) for r in rs]
+        elif len(rs) == 1:
+            return Formatter(rs[0])
+        else:
+            return Formatter(rs)
+
+    def _run_many(self, sqls: list) -> list:
+        """ 带缓存地执行一组查询，相同的查询只执行一次，按原顺序返回各自的结果行 """
+        with tracer.span('graph') as span:
+            self.query_cache.sync(self.graph.version())
+            prefetched = getattr(self._local, 'prefetched', None) or {}
+            unique = {}
+            for sql in sqls:
+                unique.setdefault(sql.key, sql)
+            fetched = {}
+            missing = []
+            for key, sql in unique.items():
+                rs = prefetched.get(key)
+                if rs is None:
+                    rs = self.query_cache.get(key)
+                if rs is None:
+                    missing.append(sql)
+                else:
+                    fetched[key] = rs
+            rows = 0
+            for sql, rs in zip(missing, self.graph.run_many(missing) if missing else []):
+                self.query_cache.put(sql.key, rs)
+                fetched[sql.key] = rs
+                rows += len(rs)
+            span.set(queries=len(sqls), unique=len(unique), hits=len(unique) - len(missing),
+                     executed=len(missing), rows=rows)
+            tracer.incr('graph_queries_total', len(missing))
+            tracer.incr('graph_rows_total', rows)
+            tracer.incr('query_cache_lookups_total', len(unique) - len(missing), result='hit')
+            tracer.incr('query_cache_lookups_total', len(missing), result='miss')
+            return [fetched[sql.key] for sql in sqls]
+
     def _search_direct(self, sql_gen, offset: int = 0, unpack: bool = False) -> list:
-        """ 进行直接查询 """
+        """ 进行直接查询，同一层的查询一并执行 """
         # 只支持双层列表的嵌套，有第三层列表嵌套时令unpack=True
+        if isinstance(sql_gen, TranslationChain):
+            generator = list(sql_gen.iter(offset, unpack))
+        else:
+            generator = list(sql_gen)
+        sqls_flat = []
+        for sqls in generator:
+            for sql in (sqls if isinstance(sqls, list) else [sqls]):
+                if sql is not None:
+                    sqls_flat.append(sql)
+        data = iter(self._run_many(sqls_flat))
 
-        def perform_sql(query_sql: str):
-            rs = self.graph.run(query_sql).data()
-            if len(rs) > 1:
-                return [Formatter(r) for r in rs]
-            elif len(rs) == 1:
-                return Formatter(rs[0])
-            else:
-                return Formatter(rs)
+        def fetch(query_sql: Cypher):
+            return Formatter(None) if query_sql is None else self._format(next(data))
 
         results = []
-        if isinstance(sql_gen, TranslationChain):
-            generator = sql_gen.iter(offset, unpack)
-        else:
-            generator = sql_gen
         for sqls in generator:
             debug('||GENERATED SQL||', sqls)
             if isinstance(sqls, list):
-                sub_results = []
-                for sql in sqls:
-                    if sql is None:
-                        sub_results.append(Formatter(None))
-                        continue
-                    sub_results.append(perform_sql(sql))
-                results.append(sub_results)
+                results.append([fetch(sql) for sql in sqls])
             else:
-                sql = sqls
-                if sql is None:
-                    results.append(Formatter(None))
-                    continue
-                results.append(perform_sql(sql))
+                results.append(fetch(sqls))
         return results
 
     def _search_direct_then_feed(self, chain: TranslationChain, unpack_key_name: str) -> tuple:
@@ -278,18 +380,32 @@ class AnswerSearcher:
                         answer.add_sub_answers(f'后者是前者的{res2}倍')
                 answer.end_sub_answers()
 
+    def _search_growth(self, chain: TranslationChain, result: Result, area: str = '') -> tuple:
+        """ 查询同比比较的数据，返回(各项[去年, 今年]的记录, 各项的增长率) """
+        cube = self.cube  # 同一回答中使用同一个值立方
+        if cube is None:
+            data = self._search_direct(chain)
+            rates = [AnswerBuilder.growth_calculation(y.value, x.value) for x, y in data]
+            return data, rates
+        indexes = result['index']
+        year = result['year'][0]
+        last_year = str(int(year) - 1)
+        data = [[cube.record(last_year, i, area), cube.record(year, i, area)] for i in indexes]
+        rates = [None if isnan(r) else round(float(r), 2)
+                 for r in cube.growth(year, last_year, indexes, area)]
+        return data, rates
+
     def make_indexes_g_compare_ans(self, answer: Answer, builder: AnswerBuilder,
                                    chain: TranslationChain, result: Result):
-        data = self._search_direct(chain)
+        data, rates = self._search_growth(chain, result)
         builder.feed_data(data)
-        for item, name in builder.product_data_with_name(result['index']):
+        for (item, name), res in zip(builder.product_data_with_name(result['index']), rates):
             x, y = item
             if builder.binary_decision(
                     x, y,
                     not_x=f'无{result["year"][0]}年关于{name.subject()}的数据',
                     not_y=f'无{result["year"][0]}前一年关于{name.subject()}的数据'
             ):
-                res = builder.growth_calculation(y.value, x.value)
                 if builder.add_if_is_not_none(
                         res, to_sub=False,
                         no=f'{result["year"][0]}年{name.subject()}的记录非数值类型，无法计算'
@@ -462,16 +578,15 @@ class AnswerSearcher:
 
     def make_areas_g_compare_ans(self, answer: Answer, builder: AnswerBuilder,
                                  chain: TranslationChain, result: Result):
-        data = self._search_direct(chain)
+        data, rates = self._search_growth(chain, result, area=result['area'][0])
         builder.feed_data(data)
-        for item, name in builder.product_data_with_name(result['area'], result['index']):
+        for (item, name), res in zip(builder.product_data_with_name(result['area'], result['index']), rates):
             x, y = item
             if builder.binary_decision(
                     x, y,
                     not_x=f'无{result["year"][0]}年关于{name.subject()}的数据',
                     not_y=f'无{result["year"][0]}前一年关于{name.subject()}的数据'
             ):
-                res = builder.growth_calculation(y.value, x.value)
                 if builder.add_if_is_not_none(
                         res, to_sub=False,
                         no=f'{result["year"][0]}年{name.subject()}的记录非数值类型，无法计算'
@@ -505,6 +620,19 @@ class AnswerSearcher:
         answer.save_chart(line)
         answer.add_answer(f'该问题的回答已渲染为图像，详见：{CHART_RENDER_DIR}/{result.raw_question}.html')
 
+    def _search_series(self, chain: TranslationChain, result: Result,
+                       builder: AnswerBuilder, gen: list, unpack: bool):
+        """ 迭代各指标(地区)在多个年份的值序列，返回(值, 单位, 名称) """
+        cube = self.cube  # 同一回答中使用同一个值立方
+        if cube is None:
+            builder.feed_data(self._search_direct(chain, unpack=unpack))
+            for item, name in builder.product_data_with_name(*gen):
+                yield builder.group_mapping_to_float(item), [n.unit for n in item], name
+            return
+        for name in builder.product_name(*gen):
+            ys, units = cube.series(result['year'], name.name, name.area)
+            yield ys.tolist(), units, name
+
     def make_indexes_or_areas_trend_ans(self, qt: str, answer: Answer, builder: AnswerBuilder,
                                         chain: TranslationChain, result: Result, mark_point: bool = False):
         if qt == 'areas_trend':
@@ -514,19 +642,15 @@ class AnswerSearcher:
             unpack = False
             gen = [result['index']]
         # collect
-        data = self._search_direct(chain, unpack=unpack)
-        builder.feed_data(data)
         collects = []  # 根据不同单位划分数据
-        for item, name in builder.product_data_with_name(*gen):
+        for ys, units, name in self._search_series(chain, result, builder, gen, unpack):
             collect = []
-            units = set([n.unit for n in item if n.unit != ''])
-            ys = builder.group_mapping_to_float(item)
             if builder.add_if_is_equal_or_not(sum(ys), 0, equal=False,
                                               no=f'指标“{name.subject()}”无任何值记录，无法比较'):
-                for unit in units:
+                for unit in set([u for u in units if u != '']):
                     tmp = []
-                    for y, n in zip(ys, item):
-                        tmp.append(y if n.unit == unit else 0)
+                    for y, u in zip(ys, units):
+                        tmp.append(y if u == unit else 0)
                     collect.append((name.subject(), unit, tmp))
                 collects.append(collect)
         # paint
@@ -0,0 +1 @@
+# 性能基准测试：在进程内的图（MemoryGraph）上运行，结果可保存为基线并与之比较
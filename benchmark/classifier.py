@@ -0,0 +1,190 @@
+# 分类器热点路径的微基准：分别测量年份填充、自动机匹配、指标模糊匹配与分类树，
+# 并以合成的词表与问题考察其随词表规模、问题长度的变化
+import sys
+import time
+import random
+import argparse
+
+import ahocorasick
+import Levenshtein
+
+import lib.utils
+from question_classifier import QuestionClassifier
+from lib.regexp import findall
+from lib.complement import year_complement, index_complement, IndexMatcher
+from lib.errors import QuestionError
+from benchmark.corpus import load_corpus, corpus_checksum
+from benchmark.report import summarize, environment, add_baseline_args, conclude
+
+BASELINE_PATH = './benchmark/classifier.baseline.json'
+VOCAB_SIZES = (1000, 10000, 50000)
+QUESTION_LENGTHS = (16, 64, 256, 1024)
+FILLERS = '的和与及比较相比是为多少了哪些占'
+TAILS = ('是多少？', '怎样？', '增长了多少？', '占比多少？', '发展如何？')
+
+
+def synthetic_words(n: int, charset: str, seed: int = 0, min_len: int = 2, max_len: int = 10) -> list:
+    """ 由charset中的字随机组成n个不重复的词 """
+    rng = random.Random(seed)
+    words = {}
+    while len(words) < n:
+        words.setdefault(''.join(rng.choices(charset, k=rng.randint(min_len, max_len))), None)
+    return list(words)
+
+
+def synthetic_questions(words: list, length: int, n: int = 50, seed: int = 0) -> list:
+    """ 以年份开头、词表中的词与虚词交替、疑问尾词结尾，生成n个约length个字的问题。
+        含数字或“年”的词会与年份连成范围，不使用，问题中只有开头一个年份。
+    """
+    rng = random.Random(seed)
+    words = [w for w in words if '年' not in w and not any(c.isdigit() for c in w)]
+    questions = []
+    for _ in range(n):
+        parts = [f'{rng.randint(11, 19)}年']
+        size = len(parts[0])
+        tail = rng.choice(TAILS)
+        while size < length - len(tail):
+            part = rng.choice(words) if rng.random() < 0.7 else rng.choice(FILLERS)
+            parts.append(part)
+            size += len(part)
+        parts.append(tail)
+        questions.append(''.join(parts)[:max(length - len(tail), 0)] + tail)
+    return questions
+
+
+def time_calls(func, inputs: list, repeat: int, setup=None) -> list:
+    """ 逐次计时func(x)，返回各次的耗时（毫秒）。
+        setup在每轮之前调用，可返回本轮的输入（如每轮需要新的可变对象）。
+    """
+    samples = []
+    for _ in range(repeat):
+        args = inputs
+        if setup is not None:
+            args = setup() or inputs
+        for x in args:
+            start = time.perf_counter()
+            try:
+                func(x)
+            except QuestionError:  # 有误的问题同样计入耗时
+                pass
+            samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def build_actree(words: list):
+    actree = ahocorasick.Automaton()
+    for i, word in enumerate(words):
+        actree.add_word(word, (i, word))
+    actree.make_automaton()
+    return actree
+
+
+def linear_match(words: list, charset_pattern, question: str, len_threshold: int = 4, ratio_threshold: float = 0.5):
+    """ 逐词计算匹配率的朴素实现，作为IndexMatcher的对照 """
+    for result in charset_pattern.findall(question):
+        if len(result) < len_threshold or result in words:
+            continue
+        scores = [Levenshtein.ratio(word, result) for word in words]
+        max_score = max(scores)
+        if max_score >= ratio_threshold:
+            return words[scores.index(max_score)], result
+    return None, None
+
+
+class ClassifierBenchmark:
+    """ 各项微基准，结果按分组汇总：stage为真实语料上的各环节，vocab与length为合成数据上的规模变化 """
+
+    def __init__(self, repeat: int = 20, vocab_sizes: tuple = VOCAB_SIZES, lengths: tuple = QUESTION_LENGTHS):
+        self.repeat = repeat
+        self.fuzzy_repeat = max(1, repeat // 4)  # 模糊匹配较慢，减少重复次数
+        self.vocab_sizes = vocab_sizes
+        self.lengths = lengths
+        self.qc = QuestionClassifier()
+        # 直接测量各方法本身，不含trace的记录
+        self.question_filter = QuestionClassifier.question_filter.__wrapped__
+        self.classify_tree = QuestionClassifier._classify_tree.__wrapped__
+        self.charset = ''.join(sorted(set(''.join(self.qc.index_wds)) - set('0123456789年')))
+        self.sections = {'stage': {}, 'vocab': {}, 'length': {}}
+
+    def record(self, section: str, name: str, samples: list):
+        self.sections[section][name] = summarize(samples)
+
+    def fresh_results(self, questions: list):
+        """ 分类树会修改结果，每轮由question_filter重新生成（不计入耗时） """
+        return lambda: [self.question_filter(self.qc, q) for q in questions]
+
+    def run_stages(self, corpus: list):
+        qc, repeat = self.qc, self.repeat
+        filtered = [year_complement(q.replace(' ', '')) for q in corpus]
+        # 年份填充的正则结果有缓存，每轮前清空以测量未命中时的耗时
+        self.record('stage', 'year_complement', time_calls(year_complement, corpus, repeat, findall.cache_clear))
+        self.record('stage', 'question_filter', time_calls(lambda q: self.question_filter(qc, q), corpus, repeat))
+        self.record('stage', 'actree', time_calls(lambda q: list(qc.region_tree.iter(q)), filtered, repeat))
+        self.record('stage', 'scan_words', time_calls(qc.scan_words, filtered, repeat))
+        self.record('stage', 'index_matcher', time_calls(qc.index_matcher.match, filtered, repeat))
+        # index_complement每次读取字表并构建匹配器，linear_match为逐词计算的朴素实现
+        self.record('stage', 'index_complement',
+                    time_calls(lambda q: index_complement(q, qc.index_wds), filtered, self.fuzzy_repeat))
+        pattern = qc.index_matcher.pattern
+        self.record('stage', 'linear_match',
+                    time_calls(lambda q: linear_match(qc.index_wds, pattern, q), filtered, self.fuzzy_repeat))
+        self.record('stage', 'classify_tree',
+                    time_calls(lambda r: self.classify_tree(qc, r), None, repeat, self.fresh_results(corpus)))
+
+    def run_vocab(self):
+        questions_words = self.qc.index_wds + self.qc.area_wds
+        for n in self.vocab_sizes:
+            words = synthetic_words(n, self.charset, seed=n)
+            # 问题中一半的词来自合成词表，另一半为真实的指标与地区
+            questions = synthetic_questions(words[:100] + questions_words, 64, seed=n)
+            start = time.perf_counter()
+            actree = build_actree(words)
+            self.record('vocab', f'actree_build[N={n}]', [(time.perf_counter() - start) * 1000])
+            self.record('vocab', f'actree[N={n}]', time_calls(lambda q: list(actree.iter(q)), questions, self.repeat))
+            matcher = IndexMatcher(words, self.charset)
+            self.record('vocab', f'index_matcher[N={n}]', time_calls(matcher.match, questions, self.fuzzy_repeat))
+
+    def run_lengths(self):
+        qc = self.qc
+        words = qc.index_wds + qc.area_wds + qc.catalog_wds
+        for length in self.lengths:
+            questions = synthetic_questions(words, length, seed=length)
+            filtered = [year_complement(q) for q in questions]
+            self.record('length', f'year_complement[L={length}]',
+                        time_calls(year_complement, questions, self.repeat, findall.cache_clear))
+            self.record('length', f'actree[L={length}]',
+                        time_calls(lambda q: list(qc.region_tree.iter(q)), filtered, self.repeat))
+            self.record('length', f'scan_words[L={length}]', time_calls(qc.scan_words, filtered, self.repeat))
+            self.record('length', f'index_matcher[L={length}]',
+                        time_calls(qc.index_matcher.match, filtered, self.fuzzy_repeat))
+            self.record('length', f'classify_tree[L={length}]',
+                        time_calls(lambda r: self.classify_tree(qc, r), None, self.fuzzy_repeat,
+                                   self.fresh_results(questions)))
+
+    def run(self, corpus: list) -> dict:
+        lib.utils.DEBUG = False  # 调试输出会计入耗时
+        self.run_stages(corpus)
+        self.run_vocab()
+        self.run_lengths()
+        return {'sections': self.sections, 'meta': {
+            'corpus': {'size': len(corpus), 'checksum': corpus_checksum(corpus)},
+            'config': {'repeat': self.repeat, 'vocab_sizes': list(self.vocab_sizes), 'lengths': list(self.lengths)},
+            'env': environment(),
+        }}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='分类器微基准')
+    parser.add_argument('-n', '--repeat', type=int, default=20, help='每项测量的重复次数（模糊匹配与长问题的分类树为其四分之一）')
+    parser.add_argument('--vocab', type=int, nargs='+', default=VOCAB_SIZES, help='合成词表的规模')
+    parser.add_argument('--length', type=int, nargs='+', default=QUESTION_LENGTHS, help='合成问题的长度')
+    add_baseline_args(parser, BASELINE_PATH)
+    args = parser.parse_args()
+
+    corpus = load_corpus()
+    report = ClassifierBenchmark(args.repeat, tuple(args.vocab), tuple(args.length)).run(corpus)
+    sys.exit(conclude(report, args))
+
+
+if __name__ == '__main__':
+    main()
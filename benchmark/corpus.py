@@ -0,0 +1,40 @@
+# 从单元测试中提取问题语料
+import ast
+import hashlib
+
+# 测试文件: 以问题为第一个参数的方法名
+SOURCES = {
+    './test/classifier_test.py': ('check_question',),
+    './test/parser_test.py': ('parse',),
+    './test/answer_test.py': ('search', 'query'),
+}
+
+
+def extract_questions(path: str, methods: tuple) -> list:
+    """ 提取测试文件中以字符串常量调用methods的第一个参数，以及赋给questions的字符串列表，按出现顺序 """
+    with open(path, encoding='utf-8') as f:
+        tree = ast.parse(f.read(), path)
+    questions = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute) and node.func.attr in methods:
+            if node.args and isinstance(node.args[0], ast.Constant) and isinstance(node.args[0].value, str):
+                questions.append((node.lineno, node.args[0].value))
+        elif isinstance(node, ast.Assign) and isinstance(node.value, ast.List):
+            if any(isinstance(t, ast.Name) and t.id == 'questions' for t in node.targets):
+                questions.extend((node.lineno, e.value) for e in node.value.elts
+                                 if isinstance(e, ast.Constant) and isinstance(e.value, str))
+    return [q for _, q in sorted(questions, key=lambda x: x[0])]
+
+
+def load_corpus(sources: dict = None) -> list:
+    """ 合并各测试文件中的问题，去重并保持顺序 """
+    corpus = {}
+    for path, methods in (sources or SOURCES).items():
+        for question in extract_questions(path, methods):
+            corpus.setdefault(question, None)
+    return list(corpus)
+
+
+def corpus_checksum(corpus: list) -> str:
+    """ 语料的摘要，比较基线时据此确认两次使用的是相同的问题 """
+    return hashlib.sha1('\n'.join(corpus).encode('utf-8')).hexdigest()
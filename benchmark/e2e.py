@@ -0,0 +1,111 @@
+# 端到端基准：以单元测试中的问题为语料，统计各阶段与各问题类型的耗时分位数和吞吐量
+import io
+import os
+import sys
+import json
+import argparse
+import tempfile
+from contextlib import redirect_stdout
+
+import lib.utils
+from chatbot import CAChatBot
+from graph_backend import MemoryGraph
+from lib.trace import tracer
+from benchmark.corpus import load_corpus, corpus_checksum
+from benchmark.report import summarize, environment, add_baseline_args, conclude
+
+BASELINE_PATH = './benchmark/e2e.baseline.json'
+
+
+def make_bot() -> CAChatBot:
+    """ 在内存图上创建web模式的问答（图表只序列化，不写入文件），不依赖Neo4j """
+    with redirect_stdout(io.StringIO()):
+        return CAChatBot(mode='web', graph=MemoryGraph.load())
+
+
+def run_corpus(bot: CAChatBot, corpus: list, warm: bool = False):
+    """ 依次回答语料中的问题，warm为假时每个问题前清空回答与查询缓存，测量完整的处理过程 """
+    for question in corpus:
+        if not warm:
+            bot.answer_cache.clear()
+            bot.searcher.query_cache.clear()
+        bot.query_detail(question)
+
+
+def collect(trace_path: str) -> dict:
+    """ 由trace按阶段、问题类型汇总耗时（毫秒） """
+    stages, types, total = {}, {}, []
+    graph = {'queries': 0, 'executed': 0, 'rows': 0}
+
+    def walk(span: dict):
+        stages.setdefault(span['name'], []).append(span['ms'])
+        if span['name'] == 'graph':
+            for k in graph:
+                graph[k] += span['attrs'].get(k, 0)
+        for child in span['children']:
+            walk(child)
+
+    with open(trace_path, encoding='utf-8') as f:
+        for line in f:
+            span = json.loads(line)
+            if span['name'] != 'query':
+                continue
+            total.append(span['ms'])
+            qt = '+'.join(span['attrs'].get('question_types', [])) or '(unknown)'
+            types.setdefault(qt, []).append(span['ms'])
+            for child in span['children']:
+                walk(child)
+
+    sections = {'total': {'query': summarize(total)},
+                'stage': {name: summarize(v) for name, v in stages.items()},
+                'question_type': {name: summarize(v) for name, v in types.items()}}
+    return {'sections': sections, 'graph': graph}
+
+
+def benchmark(corpus: list, repeat: int = 20, warmup: int = 1, warm: bool = False, trace_path: str = None) -> dict:
+    bot = make_bot()
+    lib.utils.DEBUG = False  # 调试输出会计入耗时
+    tracer.path = None
+    for _ in range(warmup):
+        run_corpus(bot, corpus, warm)
+
+    keep = trace_path is not None
+    if not keep:
+        fd, trace_path = tempfile.mkstemp(suffix='.jsonl')
+        os.close(fd)
+    open(trace_path, 'w').close()
+    tracer.path = trace_path
+    try:
+        for _ in range(repeat):
+            run_corpus(bot, corpus, warm)
+    finally:
+        tracer.path = None
+    report = collect(trace_path)
+    if not keep:
+        os.remove(trace_path)
+
+    report['meta'] = {
+        'corpus': {'size': len(corpus), 'checksum': corpus_checksum(corpus)},
+        'config': {'repeat': repeat, 'warm': warm, 'cube': bot.searcher.cube is not None},
+        'env': environment(),
+    }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description='端到端基准测试')
+    parser.add_argument('-n', '--repeat', type=int, default=20, help='语料的重复次数')
+    parser.add_argument('--warmup', type=int, default=1, help='不计入统计的预热次数')
+    parser.add_argument('--warm', action='store_true', help='保留回答与查询缓存（默认每个问题前清空）')
+    parser.add_argument('-t', '--trace', help='保留各问题的trace（JSONL）至此文件')
+    add_baseline_args(parser, BASELINE_PATH)
+    args = parser.parse_args()
+
+    corpus = load_corpus()
+    report = benchmark(corpus, args.repeat, args.warmup, args.warm, args.trace)
+    print(f'语料：{len(corpus)}个问题 × {args.repeat}次，图查询{report["graph"]["executed"]}次')
+    sys.exit(conclude(report, args))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+# 基准结果的统计、保存与比较
+import os
+import sys
+import json
+import platform
+import argparse
+
+# 比较的分位数
+PERCENTILES = ('p50', 'p95', 'p99')
+MIN_TAIL = 5  # 分位数以上至少有此数量的样本时才参与比较，样本过少的尾部分位数只是个别值
+
+
+def percentile(samples: list, p: float) -> float:
+    """ 最近秩法的分位数，samples需已排序 """
+    if not samples:
+        return 0.0
+    rank = max(1, -(-len(samples) * p // 100))  # 向上取整
+    return samples[int(rank) - 1]
+
+
+def summarize(samples: list) -> dict:
+    """ 将一组耗时（毫秒）汇总为分位数、均值与吞吐量（次/秒） """
+    samples = sorted(samples)
+    total = sum(samples)
+    summary = {'count': len(samples), 'mean': total / len(samples) if samples else 0.0}
+    for name in PERCENTILES:
+        summary[name] = percentile(samples, float(name[1:]))
+    summary['throughput'] = len(samples) / total * 1000 if total else 0.0
+    return summary
+
+
+def environment() -> dict:
+    """ 运行环境，比较不同机器上的结果时作为参考 """
+    return {'python': platform.python_version(), 'platform': platform.platform(), 'machine': platform.machine()}
+
+
+def save_report(path: str, report: dict):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2, sort_keys=True)
+
+
+def load_report(path: str) -> dict:
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def compare(current: dict, baseline: dict, threshold: float = 0.2, floor: float = 0.05) -> list:
+    """ 与基线比较各分组的分位数，返回退化项 (分组, 名称, 分位数, 基线, 当前)。
+        当前值超过基线的 1+threshold 倍且差值超过floor毫秒时视为退化，floor用于忽略计时噪声。
+    """
+    regressions = []
+    for section, groups in current['sections'].items():
+        base_groups = baseline['sections'].get(section, {})
+        for name, summary in groups.items():
+            base = base_groups.get(name)
+            if base is None:
+                continue
+            for p in PERCENTILES:
+                if min(summary['count'], base['count']) * (1 - float(p[1:]) / 100) < MIN_TAIL:
+                    continue
+                if summary[p] > base[p] * (1 + threshold) and summary[p] - base[p] > floor:
+                    regressions.append((section, name, p, base[p], summary[p]))
+    return regressions
+
+
+def print_report(report: dict, baseline: dict = None, out=sys.stdout):
+    """ 以表格输出各分组的统计，有基线时附上p50的变化 """
+    header = f'{"name":<40}{"count":>8}{"mean":>10}{"p50":>10}{"p95":>10}{"p99":>10}{"ops/s":>12}'
+    for section, groups in report['sections'].items():
+        print(f'\n[{section}] (ms)', file=out)
+        print(header + ('     Δp50' if baseline else ''), file=out)
+        for name, s in groups.items():
+            line = f'{name:<40}{s["count"]:>8}{s["mean"]:>10.3f}{s["p50"]:>10.3f}{s["p95"]:>10.3f}' \
+                   f'{s["p99"]:>10.3f}{s["throughput"]:>12.1f}'
+            base = baseline['sections'].get(section, {}).get(name) if baseline else None
+            if base is not None and base['p50']:
+                line += f'{(s["p50"] / base["p50"] - 1) * 100:>+9.1f}%'
+            print(line, file=out)
+
+
+def check_baseline(report: dict, baseline: dict, threshold: float, floor: float, out=sys.stdout) -> bool:
+    """ 输出与基线的比较结果，没有退化时返回True """
+    for key in ('corpus', 'config'):
+        if report['meta'].get(key) != baseline['meta'].get(key):
+            print(f'[warn] {key}与基线不同，比较结果仅供参考', file=out)
+    regressions = compare(report, baseline, threshold, floor)
+    for section, name, p, base, value in regressions:
+        print(f'[regression] {section}/{name} {p}: {base:.3f}ms -> {value:.3f}ms', file=out)
+    if not regressions:
+        print(f'与基线相比没有退化（阈值{threshold:.0%}）', file=out)
+    return not regressions
+
+
+def add_baseline_args(parser: argparse.ArgumentParser, baseline_path: str):
+    """ 各基准共用的基线参数 """
+    parser.add_argument('-b', '--baseline', default=baseline_path, help='基线文件')
+    parser.add_argument('--save', action='store_true', help='将本次结果保存为基线')
+    parser.add_argument('--threshold', type=float, default=0.2, help='分位数超过基线的比例达到此值时视为退化')
+    parser.add_argument('--floor', type=float, default=0.05, help='忽略小于此毫秒数的差值')
+
+
+def conclude(report: dict, args: argparse.Namespace) -> int:
+    """ 输出结果，并按参数保存为基线或与基线比较，返回进程的退出码 """
+    baseline = load_report(args.baseline) if os.path.exists(args.baseline) and not args.save else None
+    print_report(report, baseline)
+    if args.save:
+        save_report(args.baseline, report)
+        print(f'\n已保存基线至{args.baseline}')
+    elif baseline is not None:
+        print()
+        if not check_baseline(report, baseline, args.threshold, args.floor):
+            return 1
+    return 0
@@ -0,0 +1,94 @@
+# 启动基准：在新的解释器中测量导入、创建问答器、首次回答与创建web app的耗时，以及各阶段已导入的重量级依赖
+import os
+import sys
+import json
+import argparse
+import subprocess
+
+from benchmark.report import summarize, environment, add_baseline_args, conclude
+
+BASELINE_PATH = './benchmark/startup.baseline.json'
+HEAVY_MODULES = ('pyecharts', 'py2neo', 'numpy', 'Levenshtein', 'flask')
+TEXT_QUESTION = '2011年货邮周转量是多少？'
+CHART_QUESTION = '2011-13年运输总周转量的变化趋势如何？'
+
+# 在子进程中执行，各阶段依次进行，输出各阶段的耗时（毫秒）与其后已导入的重量级依赖
+PROBE_HEADER = '''
+import io, sys, json, time
+from contextlib import redirect_stdout
+
+phases, modules = {}, {}
+
+def mark(name, start):
+    phases[name] = (time.perf_counter() - start) * 1000
+    modules[name] = [m for m in HEAVY_MODULES if m in sys.modules]
+'''
+
+CHATBOT_PROBE = '''
+with redirect_stdout(io.StringIO()):
+    start = time.perf_counter()
+    from chatbot import CAChatBot
+    mark('import', start)
+    start = time.perf_counter()
+    try:
+        CAChatBot(mode='cmd')  # 默认的图后端，无需Neo4j已启动
+    except Exception:
+        pass
+    mark('construct', start)
+    from graph_backend import MemoryGraph
+    bot = CAChatBot(mode='web', graph=MemoryGraph.load())
+    start = time.perf_counter()
+    bot.query(TEXT_QUESTION)
+    mark('text_answer', start)
+    start = time.perf_counter()
+    bot.query(CHART_QUESTION)
+    mark('chart_answer', start)
+'''
+
+WEB_PROBE = '''
+with redirect_stdout(io.StringIO()):
+    start = time.perf_counter()
+    from web import create_app
+    create_app()
+    mark('web_app', start)
+'''
+
+
+def probe(body: str) -> dict:
+    """ 在新的解释器中执行一次探测，返回{'phases': ..., 'modules': ...} """
+    script = f'HEAVY_MODULES = {HEAVY_MODULES!r}\nTEXT_QUESTION = {TEXT_QUESTION!r}\n' \
+             f'CHART_QUESTION = {CHART_QUESTION!r}\n{PROBE_HEADER}{body}\n' \
+             f'print(json.dumps({{"phases": phases, "modules": modules}}))'
+    output = subprocess.run([sys.executable, '-c', script], cwd=os.getcwd(), check=True,
+                            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, encoding='utf-8').stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def benchmark(repeat: int = 10) -> dict:
+    samples, modules = {}, {}
+    for body in (CHATBOT_PROBE, WEB_PROBE):
+        for _ in range(repeat):
+            result = probe(body)
+            for name, ms in result['phases'].items():
+                samples.setdefault(name, []).append(ms)
+            modules.update(result['modules'])
+    return {'sections': {'startup': {name: summarize(v) for name, v in samples.items()}},
+            'modules': modules,
+            'meta': {'config': {'repeat': repeat}, 'env': environment()}}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='启动基准')
+    parser.add_argument('-n', '--repeat', type=int, default=10, help='每项探测启动的解释器数')
+    add_baseline_args(parser, BASELINE_PATH)
+    args = parser.parse_args()
+
+    report = benchmark(args.repeat)
+    print('各阶段之后已导入的依赖：')
+    for name, loaded in report['modules'].items():
+        print(f'  {name:<16}{", ".join(loaded) or "-"}')
+    sys.exit(conclude(report, args))
+
+
+if __name__ == '__main__':
+    main()
@@ -2,21 +2,22 @@ import os
 import json
 import pickle
 
-from py2neo import Graph, Node
-
 from lib.life import Life
 from lib.utils import write_to_file
 from lib.mapping import PREFIX_LABEL_MAP, PREFIX_S_REL_MAP, PREFIX_V_REL_MAP
-from const import URI, USERNAME, PASSWORD
+from question_classifier import QuestionClassifier
+from graph_backend import GraphBackend, Neo4jGraph, MemoryGraph, data_version
+from const import BATCH_SIZE, GRAPH_BACKEND, CUBE_PATH, LIFE_PATH
 
 
 class CivilAviationKnowledgeGraph:
 
-    def __init__(self):
+    def __init__(self, graph: GraphBackend = None, batch_size: int = BATCH_SIZE):
         self.data_path = "./data/data.json"
         self.export_dir = "./data/dicts/"
+        self.batch_size = batch_size  # 批量导入时每个事务写入的行数
 
-        self.graph = Graph(URI, auth=(USERNAME, PASSWORD))
+        self.graph = graph if graph is not None else Neo4jGraph()
         self.life = Life()
         self.entities = {}  # 收集实体
         self.attrs = {}  # 实体属性
@@ -89,60 +90,87 @@ class CivilAviationKnowledgeGraph:
         self.rels_values.append((self.cur_value_rel_src[0] + '-' + dst[0],
                                  self.cur_value_rel_src[1], dst[1], attrs))
 
-    def build(self):
-        """ 从收集的数据中构建知识图谱 """
+    def build(self, bulk: bool = True):
+        """ 从收集的数据中构建知识图谱，bulk为True时按组批量导入，否则逐条导入 """
+        print("开始构建索引...")
+        self.build_schema()
+        print("索引构建完毕!")
+
         print("开始构建实体...")
-        self.build_nodes()
+        self.build_nodes(bulk)
         print("实体构建完毕!")
 
         print("开始构建关系...")
-        self.build_relationships()
+        self.build_relationships(bulk)
         print("关系构建完毕!")
 
-    def build_nodes(self):
-        """ 构建实体结点 """
+        # 记录由数据得到的构建版本，数据改变后各处的缓存随之失效
+        self.graph.set_version(data_version(self.data_path))
+
+    def build_schema(self):
+        """ 为各标签的name属性建立索引，并报告索引状态 """
+        states = self.graph.create_indexes(PREFIX_LABEL_MAP.values())
+        for label, state in states.items():
+            print(f":{label}(name) 索引状态: {state}")
+
+    def build_nodes(self, bulk: bool = True):
+        """ 按标签分组构建实体结点 """
         for prefix, nodes in self.entities.items():
             label = PREFIX_LABEL_MAP[prefix]
-            for name in nodes:
-                self.create_node(label, name, self.attrs.get(name))
+            rows = [dict(self.attrs.get(name, {}), name=name) for name in nodes]
+            self.create_nodes(label, rows, bulk)
+
+    def build_relationships(self, bulk: bool = True):
+        """ 按(源标签, 目标标签, 关系类型)分组构建实体关系 """
+        for (src_label, dst_label, rel), rows in self.relationship_groups().items():
+            self.create_relationships(src_label, dst_label, rel, rows, bulk)
 
-    def build_relationships(self):
-        """ 构建实体关系 """
+    def relationship_groups(self) -> dict:
+        """ 将收集的关系按(源标签, 目标标签, 关系类型)分组 """
+        groups = {}
         for (prefix, src, dst) in self.rels_structures:
             a, b = prefix.split('-')
-            la = PREFIX_LABEL_MAP[a]
-            lb = PREFIX_LABEL_MAP[b]
-            rel = PREFIX_S_REL_MAP[prefix]
-            self.create_relationship(la, lb, src, dst, rel,
-                                     {'life': self.rels_structures_life[(prefix, src, dst)]})
+            key = (PREFIX_LABEL_MAP[a], PREFIX_LABEL_MAP[b], PREFIX_S_REL_MAP[prefix])
+            attrs = {'life': self.rels_structures_life[(prefix, src, dst)]}
+            groups.setdefault(key, []).append(self.make_rel_row(src, dst, key[2], attrs))
 
         for (prefix, src, dst, attrs) in self.rels_values:
             a, b = prefix.split('-')
-            la = PREFIX_LABEL_MAP[a]
-            lb = PREFIX_LABEL_MAP[b]
-            rel = PREFIX_V_REL_MAP[prefix]
-            self.create_relationship(la, lb, src, dst,
-                                     rel if rel else attrs['name'], attrs)
-
-    def create_node(self, label: str, name: str, attrs=None):
-        """ 创建结点 """
-        if attrs is None:
-            attrs = {}
-        node = Node(label, name=name, **attrs)
-        self.graph.create(node)
-
-    def create_relationship(self, src_label: str, dst_label: str, src: str, dst: str, rel: str, attrs=None):
-        """ 创建关系 """
+            rel = PREFIX_V_REL_MAP[prefix] or attrs['name']
+            key = (PREFIX_LABEL_MAP[a], PREFIX_LABEL_MAP[b], rel)
+            groups.setdefault(key, []).append(self.make_rel_row(src, dst, rel, attrs))
+        return groups
+
+    @classmethod
+    def make_rel_row(cls, src: str, dst: str, rel: str, attrs: dict = None) -> dict:
+        """ 生成导入关系的一行 """
+        return {'src': src, 'dst': dst, 'attrs': cls.make_rel_attrs(rel, attrs)}
+
+    @staticmethod
+    def make_rel_attrs(rel: str, attrs: dict = None) -> dict:
+        """ 生成关系的属性，属性值均保存为字符串 """
         if attrs:
-            rel_attrs = ", ".join([f"{k}: '{v}'" for k, v in attrs.items()])
-        else:
-            rel_attrs = "name:'%s'" % rel
-        query = f"match(s:{src_label}),(d:{dst_label}) where s.name='{src}' and d.name='{dst}' " \
-                f"create (s)-[rel:{rel} {{{rel_attrs}}}]->(d)"
-        try:
-            self.graph.run(query)
-        except Exception as err:
-            print(err)
+            return {k: str(v) for k, v in attrs.items()}
+        return {'name': rel}
+
+    def batches(self, rows: list, bulk: bool = True):
+        """ 将行按batch_size切分，非批量导入时每批一行 """
+        size = self.batch_size if bulk else 1
+        for i in range(0, len(rows), size):
+            yield rows[i:i + size]
+
+    def create_nodes(self, label: str, rows: list, bulk: bool = True):
+        """ 创建同一标签的结点 """
+        for batch in self.batches(rows, bulk):
+            self.graph.create_nodes(label, batch)
+
+    def create_relationships(self, src_label: str, dst_label: str, rel: str, rows: list, bulk: bool = True):
+        """ 创建同一类型的关系 """
+        for batch in self.batches(rows, bulk):
+            try:
+                self.graph.create_relationships(src_label, dst_label, rel, batch)
+            except Exception as err:
+                print(err)
 
     def export_collections(self):
         """ 导出收集的实体 """
@@ -163,16 +191,29 @@ class CivilAviationKnowledgeGraph:
             fast_table.remove(char)
         write_to_file("./data/dicts/fast_index_table.txt", [''.join(fast_table)])
 
+    def export_value_cube(self):
+        """ 导出值立方，记录图的构建版本，需在构建之后进行 """
+        from lib.cube import ValueCube  # 依赖numpy，MemoryGraph.load只需构建图，不必导入
+
+        ValueCube.from_rels(self.rels_values, self.graph.version()).save(CUBE_PATH)
+
+    def export_classifier(self):
+        """ 导出分类器预编译数据，需在导出实体之后进行 """
+        QuestionClassifier(artifact_path=None).save()
+
     def export_life_code(self):
         """ 导出生命周期编码 """
-        with open("./data/dicts/life.pk", 'wb') as f:
+        with open(LIFE_PATH, 'wb') as f:
             pickle.dump(self.life, f)
 
 
 if __name__ == '__main__':
-    cakg = CivilAviationKnowledgeGraph()
+    # 使用内存后端时无需导入Neo4j，仅导出词典等数据
+    cakg = CivilAviationKnowledgeGraph(MemoryGraph() if GRAPH_BACKEND == 'memory' else None)
     cakg.collect()
     cakg.build()
     cakg.export_collections()
     cakg.export_fast_index_table()
     cakg.export_life_code()
+    cakg.export_value_cube()
+    cakg.export_classifier()
@@ -1,17 +1,32 @@
+import time
+import threading
+from concurrent.futures import Executor
+
 from question_classifier import QuestionClassifier
 from question_parser import QuestionParser
 from answer_search import AnswerSearcher
+from graph_backend import GraphBackend
+from lib.cache import LRUCache
+from lib.result import Result
 from lib.errors import QuestionError
+from lib.trace import tracer
+from const import ANSWER_CACHE_SIZE, ANSWER_CACHE_TTL, QUERY_BATCH_SIZE, CHART_RENDER_DIR, \
+    CHART_RENDER_BACKGROUND
 
 
 class CAChatBot:
 
-    def __init__(self, mode: str = 'cmd'):
+    _shared = {}  # 模式: CAChatBot
+    _lock = threading.Lock()
+
+    def __init__(self, mode: str = 'cmd', graph: GraphBackend = None):
         assert mode in ('cmd', 'notebook', 'web')
 
         self.classifier = QuestionClassifier()
         self.parser = QuestionParser()
-        self.searcher = AnswerSearcher()
+        self.searcher = AnswerSearcher(graph)
+        # 回答缓存：(模式, 问题的规范形式): (含图表时的原问题, 回答)
+        self.answer_cache = LRUCache(ANSWER_CACHE_SIZE, ANSWER_CACHE_TTL)
 
         self.mode = mode
 
@@ -20,30 +35,137 @@ class CAChatBot:
         self.default_answer = '抱歉！小航能力有限，无法回答您这个问题。可以联系开发者哟！'
         self.goodbye = '小航期待与你的下次见面，拜拜！'
 
+    @classmethod
+    def shared(cls, mode: str = 'web'):
+        """ 返回进程内共享的问答器，首次调用时创建，web app的worker在收到第一个请求时才载入 """
+        with cls._lock:
+            bot = cls._shared.get(mode)
+            if bot is None:
+                bot = cls._shared[mode] = cls(mode)
+            return bot
+
     def query(self, question: str):
+        return self.query_detail(question)['answer']
+
+    def query_detail(self, question: str) -> dict:
+        """ 回答问题，并返回问题类型与渲染的图表文件（web模式下图表不渲染为文件） """
+        detail = {'answer': self.default_answer, 'question_types': [], 'charts': []}
+        with tracer.span('query', question=question) as span:
+            try:
+                # 开始查询
+                result = self.classifier.classify(question)
+                if result is None or result.is_qt_null():
+                    tracer.incr('questions_total', status='unknown')
+                    return detail
+                detail['question_types'] = list(result.question_types)
+                span.set(question_types=detail['question_types'])
+                key, cached = self._lookup(result)
+                span.set(cached=cached is not None)
+                tracer.incr('questions_total', status='cached' if cached is not None else 'answered')
+                if cached is None:
+                    cached = self._answer(key, self.parser.parse(result))
+                chart_question, detail['answer'] = cached
+                if chart_question is not None and self.mode != 'web':
+                    detail['charts'].append(f'{CHART_RENDER_DIR}/{chart_question}.html')
+            except QuestionError as err:
+                tracer.incr('questions_total', status='error')
+                detail['answer'] = err.args[0]
+        return detail
+
+    async def aquery(self, question: str, executor: Executor = None):
+        """ query的异步版本：分类与查询在executor中执行，命中回答缓存时不占用线程 """
+        import asyncio  # 只有异步web app用到
+
+        # 事件循环上交替执行的协程不能共用线程内的span栈，故整体耗时单独记录，各阶段在executor线程中各自成树
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter()
         try:
-            final_ans = ''
-            # 开始查询
-            result = self.classifier.classify(question)
+            result = await loop.run_in_executor(executor, self.classifier.classify, question)
             if result is None or result.is_qt_null():
+                tracer.incr('questions_total', status='unknown')
                 return self.default_answer
-            result = self.parser.parse(result)
-            answers = self.searcher.search(result)
-            # 合并回答与渲染图表
-            for answer in answers:
-                final_ans += (answer.to_string().rstrip('。') + '。')
-                if answer.have_charts() and self.mode != 'web':
-                    answer.combine_charts()
-                    answer.render_chart(result.raw_question)
-            # 依不同模式返回
-            if self.mode == 'notebook':
-                return final_ans, answers[0].get_chart()  # None or chart
-            elif self.mode == 'web':
-                return final_ans, answers[0].get_charts()  # chart list
-            else:  # default: 'cmd'
-                return final_ans
+            key, cached = self._lookup(result)
+            tracer.incr('questions_total', status='cached' if cached is not None else 'answered')
+            if cached is None:
+                cached = await loop.run_in_executor(executor, self._answer, key, self.parser.parse(result))
+            return cached[1]
         except QuestionError as err:
+            tracer.incr('questions_total', status='error')
             return err.args[0]
+        finally:
+            tracer.observe('query', time.perf_counter() - start)
+
+    def query_many(self, questions: list, batch_size: int = QUERY_BATCH_SIZE) -> list:
+        """ 批量回答问题：每批先分类、解析全部问题，将第一层查询合并去重后一并执行，再逐个组织回答。
+            按原顺序返回各问题的回答，问题有误时其回答为错误信息，同query。
+        """
+        responses = [None] * len(questions)
+        for start in range(0, len(questions), batch_size):
+            pending = []  # (位置, 缓存键, 解析后的结果)
+            for i in range(start, min(start + batch_size, len(questions))):
+                try:
+                    result = self.classifier.classify(questions[i])
+                    if result is None or result.is_qt_null():
+                        responses[i] = self.default_answer
+                        continue
+                    key, cached = self._lookup(result)
+                    if cached is not None:
+                        responses[i] = cached[1]
+                        continue
+                    pending.append((i, key, self.parser.parse(result)))
+                except QuestionError as err:
+                    responses[i] = err.args[0]
+            # 预取的结果在该批回答完之前一直保留，不会因查询结果缓存已满而被淘汰
+            with self.searcher.prefetched(self.searcher.prefetch([result for _, _, result in pending])):
+                for i, key, result in pending:
+                    try:
+                        responses[i] = self._answer(key, result)[1]
+                    except QuestionError as err:
+                        responses[i] = err.args[0]
+        return responses
+
+    def _lookup(self, result: Result) -> tuple:
+        """ 返回(缓存键, 缓存的回答)，未命中时缓存的回答为None。
+            同义的问题直接使用缓存的回答，图表的标题与文件名取自原问题，故含图表（或提及图表文件）的回答只对相同问题复用。
+        """
+        self.answer_cache.sync(self.searcher.graph.version())
+        key = (self.mode, result.semantic_key())
+        return key, self.answer_cache.get(key, check=lambda c: c[0] is None or c[0] == result.raw_question)
+
+    def _answer(self, key: tuple, result: Result) -> tuple:
+        """ 查询并组织已解析问题的回答，存入缓存后返回(含图表时的原问题, 回答) """
+        final_ans = ''
+        answers = self.searcher.search(result)
+        # 合并回答与渲染图表
+        for answer in answers:
+            final_ans += (answer.to_string().rstrip('。') + '。')
+            if answer.have_charts() and self.mode != 'web':
+                answer.combine_charts()
+                answer.render_chart(result.raw_question, background=CHART_RENDER_BACKGROUND)
+        # 依不同模式返回
+        if self.mode == 'notebook':
+            response = final_ans, answers[0].get_chart()  # None or chart
+        elif self.mode == 'web':
+            # 图表配置在回答时序列化一次，随回答一起缓存
+            response = final_ans, [chart.dump_options() for chart in answers[0].get_charts()]  # JSON list
+        else:  # default: 'cmd'
+            response = final_ans
+        # 含图表或文本中提及原问题（图表的文件名）的回答，只对相同问题复用
+        have_charts = any(answer.have_charts() for answer in answers)
+        entry = (result.raw_question if have_charts or result.raw_question in final_ans else None, response)
+        self.answer_cache.put(key, entry)
+        return entry
+
+    def cache_stats(self) -> dict:
+        """ 回答缓存与查询缓存的统计信息 """
+        return {'answer': self.answer_cache.stats(), 'query': self.searcher.query_cache.stats()}
+
+    def metrics(self) -> str:
+        """ 以Prometheus文本格式导出各阶段耗时、计数与缓存状态 """
+        for cache, stats in self.cache_stats().items():
+            for name in ('size', 'hit_ratio'):
+                tracer.gauge(f'cache_{name}', stats[name], cache=cache)
+        return tracer.prometheus()
 
     def run(self):
         while 1:
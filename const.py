@@ -5,3 +5,30 @@ DEBUG = True
 # DEBUG = False
 
 CHART_RENDER_DIR = 'results'  # 生成图表的保存位置
+CHART_RENDER_BACKGROUND = True  # 是否在后台线程中将图表渲染为html文件，不阻塞回答
+
+GRAPH_BACKEND = 'neo4j'  # 图数据库后端：'neo4j' 或 'memory'（由data.json载入内存，无需Neo4j）
+QUERY_WORKERS = 8  # 并发执行同一层查询的线程数，为1时顺序执行
+POOL_SIZE = 16  # Neo4j连接池的最大连接数（进程内共享）
+QUERY_RETRIES = 2  # 查询遇到暂时性错误时的重试次数
+PING_INTERVAL = 60  # 连接空闲超过此秒数后，使用前先检查连接是否存活
+BATCH_SIZE = 1000  # 构建知识图谱时每批导入的结点/关系数
+CUBE_PATH = './data/dicts/cube.pk'  # 值立方（年份×指标×地区）的保存位置
+LIFE_PATH = './data/dicts/life.pk'  # 生命周期编码的保存位置
+GRAPH_VERSION_PATH = './data/dicts/graph.version'  # 知识图谱构建版本的保存位置，用于使缓存失效
+CLASSIFIER_PATH = './data/dicts/classifier.pk'  # 分类器预编译数据（自动机与词表）的保存位置
+CLASSIFIER_VERSION = 3  # 预编译数据的格式版本，改变分类器的数据结构时递增
+
+ANSWER_CACHE_SIZE = 1024  # 回答缓存的容量
+ANSWER_CACHE_TTL = 3600  # 回答缓存的存活时间（秒），None为永不过期
+QUERY_CACHE_SIZE = 4096  # 查询结果缓存的容量
+QUERY_BATCH_SIZE = 200  # 批量问答时每批的问题数，每批预取的结果行在该批回答完之前保留于内存中
+
+CHART_STORE = 'memory'  # web app中图表的暂存：'memory'（单进程）或 'sqlite'（多进程共享）
+CHART_STORE_PATH = './data/charts.sqlite3'  # sqlite暂存的文件位置
+CHART_STORE_SIZE = 1024  # 暂存的回答（令牌）数上限
+CHART_STORE_TTL = 1800  # 图表的存活时间（秒）
+ASYNC_WORKERS = 8  # 异步web app中执行分类与查询的线程数
+
+TRACE_PATH = None  # 各阶段耗时trace（JSONL）的输出文件，None为不输出；/metrics的统计不受影响
+TRACE_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)  # 耗时直方图的上界（秒）
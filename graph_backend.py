@@ -0,0 +1,415 @@
+# 图数据库后端
+import os
+import time
+import atexit
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+
+from question_parser import QuestionParser
+from lib.chain import Cypher
+from lib.artifact import checksum
+from lib.trace import tracer
+from const import URI, USERNAME, PASSWORD, GRAPH_BACKEND, GRAPH_VERSION_PATH, QUERY_WORKERS, \
+    POOL_SIZE, QUERY_RETRIES, PING_INTERVAL
+
+
+class GraphBackend:
+    """ 图数据库后端的接口，读取端供回答组织器使用，写入端供知识图谱构建使用 """
+
+    def run(self, sql: Cypher) -> list:
+        """ 执行查询，返回结果行(字典)的列表 """
+        raise NotImplementedError
+
+    def run_many(self, sqls: list) -> list:
+        """ 执行一组查询，按原顺序返回各自的结果行 """
+        return [self.run(sql) for sql in sqls]
+
+    def version(self) -> str:
+        """ 图的构建版本，每次重新构建后改变，各处的缓存据此失效 """
+        raise NotImplementedError
+
+    def set_version(self, version: str):
+        """ 构建完成后记录新的构建版本 """
+        raise NotImplementedError
+
+    def create_indexes(self, labels) -> dict:
+        """ 为各标签的name属性建立索引，返回{标签: 索引状态} """
+        raise NotImplementedError
+
+    def create_nodes(self, label: str, rows: list):
+        """ 创建同一标签的结点，每行为结点的属性；同名结点已存在时更新其属性，重复构建不产生重复结点 """
+        raise NotImplementedError
+
+    def create_relationships(self, src_label: str, dst_label: str, rel: str, rows: list):
+        """ 创建同一类型的关系，每行为{'src': 源结点名, 'dst': 目标结点名, 'attrs': 关系属性}；
+            两结点间已有该类型的关系时更新其属性
+        """
+        raise NotImplementedError
+
+
+class Neo4jDriver:
+    """ 进程内共享的Neo4j连接，带有连接池上限、存活检查、暂时性错误重试与退出时关闭。
+        首次查询时才导入py2neo并建立连接，只回答缓存或值立方中的问题时不连接。
+    """
+
+    _shared = {}  # (uri, auth): Neo4jDriver
+    _lock = threading.Lock()
+    # 可重试的错误（py2neo不同版本中的名称）
+    transient_errors = ('TransientError', 'ServiceUnavailable', 'WriteServiceUnavailable',
+                        'ConnectionUnavailable', 'ConnectionBroken', 'ConnectionLimit')
+
+    def __init__(self, uri: str = URI, auth: tuple = (USERNAME, PASSWORD), pool_size: int = POOL_SIZE,
+                 retries: int = QUERY_RETRIES, ping_interval: float = PING_INTERVAL):
+        self.uri = uri
+        self.auth = auth
+        self.pool_size = pool_size
+        self.retries = retries
+        self.ping_interval = ping_interval  # 距上次成功使用超过此秒数时先检查连接
+        self._graph_lock = threading.Lock()
+        self._graph = None
+        self._in_flight = {}  # id(Graph): 正在其上执行的查询数
+        self._last_used = time.monotonic()
+
+    @classmethod
+    def shared(cls, uri: str = URI, auth: tuple = (USERNAME, PASSWORD)):
+        """ 返回进程内共享的连接，首次调用时创建 """
+        with cls._lock:
+            driver = cls._shared.get((uri, auth))
+            if driver is None:
+                driver = cls._shared[(uri, auth)] = cls(uri, auth)
+            return driver
+
+    @classmethod
+    def close_all(cls):
+        with cls._lock:
+            for driver in cls._shared.values():
+                driver.close()
+            cls._shared.clear()
+
+    @property
+    def graph(self):
+        """ py2neo的Graph，首次使用时连接 """
+        if self._graph is None:
+            with self._graph_lock:
+                if self._graph is None:
+                    self._graph = self._connect()
+                    self._last_used = time.monotonic()
+        return self._graph
+
+    def _connect(self):
+        from py2neo import Graph
+
+        try:
+            return Graph(self.uri, auth=self.auth, max_size=self.pool_size)
+        except TypeError:  # py2neo 4.x不支持设置连接池大小
+            return Graph(self.uri, auth=self.auth)
+
+    def reconnect(self):
+        """ 以新的连接替换当前的连接，旧的连接在其上的查询都结束后才关闭，不中断其他线程中的查询 """
+        graph = self._connect()
+        with self._graph_lock:
+            old, self._graph = self._graph, graph
+            self._last_used = time.monotonic()
+            idle = id(old) not in self._in_flight
+        if old is not None and idle:
+            self._close_graph(old)
+
+    @contextmanager
+    def _borrow(self):
+        """ 取得当前的连接执行查询，期间记录其上的查询数 """
+        graph = self.graph  # 尚未连接时连接
+        with self._graph_lock:
+            graph = self._graph  # 可能已被其他线程替换
+            self._in_flight[id(graph)] = self._in_flight.get(id(graph), 0) + 1
+        try:
+            yield graph
+        finally:
+            with self._graph_lock:
+                count = self._in_flight.pop(id(graph)) - 1
+                if count:
+                    self._in_flight[id(graph)] = count
+                retired = count == 0 and graph is not self._graph
+            if retired:  # 已被reconnect替换，最后一个查询结束后关闭
+                self._close_graph(graph)
+
+    def close(self):
+        """ 关闭连接池中的所有连接，尚未连接时不做处理 """
+        self._close_graph(self._graph)
+
+    @staticmethod
+    def _close_graph(graph):
+        service = getattr(graph, 'service', None) or getattr(graph, 'database', None)
+        connector = getattr(service, 'connector', None)
+        if connector is not None:
+            connector.close()
+
+    def ping(self) -> bool:
+        try:
+            with self._borrow() as graph:
+                graph.run('return 1').data()
+            return True
+        except Exception:
+            return False
+
+    def is_transient(self, err: Exception) -> bool:
+        return isinstance(err, (ConnectionError, TimeoutError)) or type(err).__name__ in self.transient_errors
+
+    def run(self, query: str, params: dict = None, retry: bool = True) -> list:
+        """ 执行查询并返回结果行，retry为假时不重试（用于非幂等的写入） """
+        if time.monotonic() - self._last_used > self.ping_interval and not self.ping():
+            self.reconnect()
+        attempts = self.retries + 1 if retry else 1
+        for attempt in range(attempts):
+            try:
+                with self._borrow() as graph:
+                    data = graph.run(query, params).data()
+                self._last_used = time.monotonic()
+                return data
+            except Exception as err:
+                if attempt == attempts - 1 or not self.is_transient(err):
+                    raise
+                time.sleep(0.1 * 2 ** attempt)
+                if not self.ping():
+                    self.reconnect()
+
+
+atexit.register(Neo4jDriver.close_all)
+
+
+class Neo4jGraph(GraphBackend):
+    """ Neo4j后端 """
+
+    def __init__(self, driver: Neo4jDriver = None, version_path: str = GRAPH_VERSION_PATH,
+                 workers: int = QUERY_WORKERS):
+        self.driver = driver if driver is not None else Neo4jDriver.shared()
+        self.version_path = version_path  # 构建版本保存在本地文件中，文件修改后才重新读取
+        self._version = ''
+        self._version_mtime = None
+        # 同一层中互不依赖的查询并发执行，workers为1时顺序执行
+        self.workers = workers
+        self._executor = ThreadPoolExecutor(workers, thread_name_prefix='neo4j-query') if workers > 1 else None
+
+    def run(self, sql: Cypher) -> list:
+        return self.driver.run(sql.query, sql.params)
+
+    def run_many(self, sqls: list) -> list:
+        """ 模板相同的查询合并为一次UNWIND查询，各模板的查询并发执行 """
+        groups = {}
+        for i, sql in enumerate(sqls):
+            groups.setdefault(sql.query, []).append(i)
+        groups = list(groups.values())
+        parent = tracer.current()  # 线程池中的span挂在调用方的span下
+        if self._executor is None or len(groups) == 1:
+            grouped = [self._run_group(sqls, positions, parent) for positions in groups]
+        else:
+            grouped = list(self._executor.map(lambda positions: self._run_group(sqls, positions, parent), groups))
+        results = [[] for _ in sqls]
+        for positions, rows in zip(groups, grouped):
+            for i, rs in zip(positions, rows):
+                results[i] = rs
+        return results
+
+    def _run_group(self, sqls: list, positions: list, parent=None) -> list:
+        """ 执行一组模板相同的查询，按positions的顺序返回各自的结果行 """
+        with tracer.span('graph_group', parent=parent,
+                         template=sqls[positions[0]].query, queries=len(positions)) as span:
+            if len(positions) == 1:
+                rows = [self.run(sqls[positions[0]])]
+            else:
+                rows = [[] for _ in positions]
+                for r in self.run(Cypher.unwind([sqls[i] for i in positions])):
+                    rows[r.pop('_i')].append(r)
+            span.set(rows=sum(len(rs) for rs in rows))
+        return rows
+
+    def version(self) -> str:
+        try:
+            mtime = os.stat(self.version_path).st_mtime_ns
+        except OSError:
+            return ''
+        if mtime != self._version_mtime:
+            with open(self.version_path, encoding='utf-8') as f:
+                self._version = f.read().strip()
+            self._version_mtime = mtime
+        return self._version
+
+    def set_version(self, version: str):
+        os.makedirs(os.path.dirname(self.version_path), exist_ok=True)
+        with open(self.version_path, 'w', encoding='utf-8') as f:
+            f.write(version + '\n')
+
+    def create_indexes(self, labels) -> dict:
+        """ 以唯一性约束建立索引，已存在的则跳过 """
+        indexes = self.schema_indexes()
+        for label in labels:
+            if (label, 'name') in indexes:
+                continue
+            try:
+                self.driver.run(f"create constraint on (n:{label}) assert n.name is unique", retry=False)
+            except Exception as err:
+                print(err)
+        self.driver.run("call db.awaitIndexes(300)")
+        indexes = self.schema_indexes()
+        return {label: indexes.get((label, 'name'), 'MISSING') for label in labels}
+
+    def schema_indexes(self) -> dict:
+        """ 查询已有的单属性索引，返回{(标签, 属性): 状态} """
+        indexes = {}
+        for r in self.driver.run("call db.indexes()"):
+            # Neo4j 3.5为tokenNames，4.x以后为labelsOrTypes
+            labels = r.get('tokenNames') or r.get('labelsOrTypes') or []
+            properties = r.get('properties') or []
+            if len(labels) == 1 and len(properties) == 1:
+                indexes[(labels[0], properties[0])] = r.get('state')
+        return indexes
+
+    def create_nodes(self, label: str, rows: list):
+        # 以唯一的name合并，重复构建时不违反唯一性约束
+        self.driver.run(f"unwind $rows as row merge (n:{label} {{name: row.name}}) set n += row",
+                        {'rows': rows}, retry=False)
+
+    def create_relationships(self, src_label: str, dst_label: str, rel: str, rows: list):
+        query = f"unwind $rows as row " \
+                f"match (s:{src_label}),(d:{dst_label}) where s.name=row.src and d.name=row.dst " \
+                f"merge (s)-[rel:`{rel}`]->(d) set rel = row.attrs"
+        self.driver.run(query, {'rows': rows}, retry=False)
+
+
+class MemoryGraph(GraphBackend):
+    """ 内存后端，直接由data.json载入，只支持解析器生成的几类查询 """
+
+    def __init__(self):
+        self._nodes = {}  # (label, name): attrs
+        self._out = {}  # (label, name): {rel: [((label, name), attrs)]}
+        self._in = {}  # (label, name): {rel: [((label, name), attrs)]}
+        self._version = ''
+        self._handlers = self._make_handlers(QuestionParser())
+
+    @classmethod
+    def load(cls, data_path: str = './data/data.json'):
+        """ 从data.json构建内存图 """
+        from build_cakg import CivilAviationKnowledgeGraph
+
+        graph = cls()
+        cakg = CivilAviationKnowledgeGraph(graph)
+        cakg.data_path = data_path
+        cakg.collect()
+        cakg.build()
+        return graph
+
+    def _make_handlers(self, qp: QuestionParser) -> dict:
+        """ 查询模板与其处理方法的映射 """
+        return {
+            qp.sql_Y_status: self._year_status,
+            qp.sql_C_status: self._catalog_status,
+            qp.sql_I_value: self._index_value,
+            qp.sql_I_value + ',r.child_id': lambda p: self._index_value(p, child_id=True),
+            qp.sql_A_value: self._area_value,
+            qp.sql_A_value + ',r.child_id': lambda p: self._area_value(p, child_id=True),
+            qp.sql_find_I_parent: lambda p: self._find_parent('Index', p['i']),
+            qp.sql_find_A_parent: lambda p: self._find_parent('Area', p['a']),
+            qp.sql_find_I_child: self._find_index_child,
+            qp.sql_find_Is: lambda p: self._find_year_dst(p['y'], 'value', 'Index', 'i.name'),
+            qp.sql_find_Cs: lambda p: self._find_year_dst(p['y'], 'include', 'Catalog', 'c.name'),
+            qp.sql_find_begin_stats_Ys: self._find_begin_stats_years,
+        }
+
+    def run(self, sql: Cypher) -> list:
+        handler = self._handlers.get(sql.template)
+        if handler is None:
+            raise ValueError(f'内存后端不支持此查询：{sql.template}')
+        return handler(sql.params)
+
+    def version(self) -> str:
+        return self._version
+
+    def set_version(self, version: str):
+        self._version = version
+
+    def create_indexes(self, labels) -> dict:
+        # 结点本就以(标签, 名称)为键保存
+        return {label: 'ONLINE' for label in labels}
+
+    def create_nodes(self, label: str, rows: list):
+        for row in rows:
+            self._nodes[(label, row['name'])] = dict(row)
+
+    def create_relationships(self, src_label: str, dst_label: str, rel: str, rows: list):
+        for row in rows:
+            src, dst = (src_label, row['src']), (dst_label, row['dst'])
+            if src not in self._nodes or dst not in self._nodes:
+                continue
+            attrs = dict(row['attrs'])
+            out = self._out.setdefault(src, {}).setdefault(rel, [])
+            in_ = self._in.setdefault(dst, {}).setdefault(rel, [])
+            # 同Neo4j后端的merge，两结点间已有该类型的关系时替换其属性
+            out[:] = [edge for edge in out if edge[0] != dst]
+            in_[:] = [edge for edge in in_ if edge[0] != src]
+            out.append((dst, attrs))
+            in_.append((src, attrs))
+
+    # 各类查询
+
+    def _edges(self, node: tuple, rel: str, dst_label: str, dst_name: str = None, reverse: bool = False):
+        """ 迭代结点某类型的关系，返回(另一端结点, 关系属性) """
+        adjacency = self._in if reverse else self._out
+        for (label, name), attrs in adjacency.get(node, {}).get(rel, []):
+            if label == dst_label and (dst_name is None or name == dst_name):
+                yield (label, name), attrs
+
+    def _year_status(self, params: dict) -> list:
+        node = self._nodes.get(('Year', params['y']))
+        return [] if node is None else [{'y.info': node.get('info')}]
+
+    def _catalog_status(self, params: dict) -> list:
+        return [{'r.info': attrs.get('info')}
+                for _, attrs in self._edges(('Year', params['y']), 'info', 'Catalog', params['c'])]
+
+    def _index_value(self, params: dict, child_id: bool = False) -> list:
+        rows = []
+        for _, attrs in self._edges(('Year', params['y']), 'value', 'Index', params['i']):
+            row = {'r.value': attrs.get('value'), 'r.unit': attrs.get('unit')}
+            if child_id:
+                row['r.child_id'] = attrs.get('child_id')
+            rows.append(row)
+        return rows
+
+    def _area_value(self, params: dict, child_id: bool = False) -> list:
+        rows = []
+        for _, attrs in self._edges(('Year', params['y']), params['i'], 'Area', params['a']):
+            row = {'r.value': attrs.get('value'), 'r.unit': attrs.get('unit'), 'r.repr': attrs.get('repr')}
+            if child_id:
+                row['r.child_id'] = attrs.get('child_id')
+            rows.append(row)
+        return rows
+
+    def _find_parent(self, label: str, name: str) -> list:
+        return [{'n.name': parent, 'r.life': attrs.get('life')}
+                for (_, parent), attrs in self._edges((label, name), 'contain', label, reverse=True)]
+
+    def _find_index_child(self, params: dict) -> list:
+        rows = []
+        for edges in self._out.get(('Index', params['i']), {}).values():
+            for (label, name), attrs in edges:
+                rows.append({'m.name': name, 'labels(m)[0]': label, 'r.life': attrs.get('life')})
+        return rows
+
+    def _find_year_dst(self, year: str, rel: str, dst_label: str, key: str) -> list:
+        return [{key: name} for (_, name), _ in self._edges(('Year', year), rel, dst_label)]
+
+    def _find_begin_stats_years(self, params: dict) -> list:
+        return [{'y.name': name}
+                for (_, name), _ in self._edges(('Index', params['i']), 'value', 'Year', reverse=True)]
+
+
+def data_version(data_path: str = './data/data.json') -> str:
+    """ 由数据文件的校验和得到构建版本号，同一份数据构建的图（及导出的值立方）版本相同 """
+    return checksum([data_path])[:16]
+
+
+def make_graph(backend: str = GRAPH_BACKEND, driver: Neo4jDriver = None) -> GraphBackend:
+    """ 按配置创建图数据库后端，Neo4j后端默认使用进程内共享的连接 """
+    if backend == 'memory':
+        return MemoryGraph.load()
+    return Neo4jGraph(driver)
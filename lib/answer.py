@@ -1,13 +1,27 @@
 # 回答构建器
+import threading
 from itertools import product
 from types import FunctionType
-
-from pyecharts.charts import Page
+from concurrent.futures import ThreadPoolExecutor
 
 from lib.formatter import Formatter
+from lib.trace import tracer
 from const import CHART_RENDER_DIR
 
 
+_renderer = None  # 在后台渲染图表的线程
+_renderer_lock = threading.Lock()
+
+
+def chart_renderer() -> ThreadPoolExecutor:
+    """ 返回渲染图表文件的后台线程，首次使用时创建 """
+    global _renderer
+    with _renderer_lock:
+        if _renderer is None:
+            _renderer = ThreadPoolExecutor(1, thread_name_prefix='chart-render')
+        return _renderer
+
+
 class Answer:
 
     def __init__(self):
@@ -28,6 +42,8 @@ class Answer:
         # 若有大于一个以上的图表，将它们合为一个图表（Page类型）
         # 不直接画到一个图表上，是因为在web app中无法直接嵌入Page类型，而其他模式均可以
         if len(self._charts) > 1:
+            from pyecharts.charts import Page
+
             page = Page()
             page.add(*self._charts)
             self._charts.clear()
@@ -39,9 +55,13 @@ class Answer:
     def get_charts(self):
         return self._charts
 
-    def render_chart(self, name: str):
-        chart = self._charts[0]
-        chart.render(f'{CHART_RENDER_DIR}/{name}.html')
+    def render_chart(self, name: str, background: bool = False):
+        """ 渲染图表为html文件，background为真时交由后台线程渲染，返回其Future """
+        render = tracer.traced('render')(self._charts[0].render)
+        path = f'{CHART_RENDER_DIR}/{name}.html'
+        if background:
+            return chart_renderer().submit(render, path)
+        render(path)
 
     def have_charts(self):
         return len(self._charts) != 0
@@ -0,0 +1,39 @@
+# 带版本与校验和的预编译数据
+import os
+import pickle
+import hashlib
+
+
+def checksum(paths: list) -> str:
+    """ 计算一组源文件内容的校验和（包含文件名，增删文件同样会改变结果） """
+    sha = hashlib.sha256()
+    for path in sorted(paths):
+        sha.update(os.path.basename(path).encode('utf-8') + b'\0')
+        with open(path, 'rb') as f:
+            sha.update(f.read())
+        sha.update(b'\0')
+    return sha.hexdigest()
+
+
+def save_artifact(path: str, version: int, sources: str, payload):
+    """ 保存预编译数据，先写临时文件再替换，避免并发进程读到不完整的文件 """
+    data = pickle.dumps(payload, protocol=pickle.HIGHEST_PROTOCOL)
+    header = {'version': version, 'sources': sources, 'digest': hashlib.sha256(data).hexdigest()}
+    tmp_path = '{}.{}.tmp'.format(path, os.getpid())
+    with open(tmp_path, 'wb') as f:
+        pickle.dump((header, data), f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+
+
+def load_artifact(path: str, version: int, sources: str):
+    """ 一次读取预编译数据，文件不存在、版本或源文件校验和不符、内容损坏时返回None """
+    try:
+        with open(path, 'rb') as f:
+            header, data = pickle.load(f)
+    except (OSError, EOFError, ValueError, TypeError, pickle.UnpicklingError):
+        return None
+    if header.get('version') != version or header.get('sources') != sources:
+        return None
+    if hashlib.sha256(data).hexdigest() != header.get('digest'):
+        return None
+    return pickle.loads(data)
@@ -0,0 +1,66 @@
+# 线程安全的LRU缓存
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Optional
+
+_MISSING = object()
+
+
+class LRUCache:
+    """ 有容量上限与存活时间的LRU缓存，记录命中与未命中次数。
+        与图的构建版本绑定，版本改变时清空。
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = None):
+        self.maxsize = maxsize
+        self.ttl = ttl  # 秒，None为永不过期
+        self.version = None
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()  # key: (过期时刻, value)
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None, check: Optional[Callable[[Any], bool]] = None):
+        """ 取出缓存值，check为对缓存值的额外检查，不通过时视为未命中 """
+        with self._lock:
+            item = self._data.get(key, _MISSING)
+            if item is not _MISSING:
+                expire, value = item
+                if expire is not None and expire < time.monotonic():
+                    del self._data[key]
+                elif check is None or check(value):
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+            self.misses += 1
+            return default
+
+    def put(self, key, value):
+        with self._lock:
+            expire = None if self.ttl is None else time.monotonic() + self.ttl
+            self._data[key] = (expire, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def sync(self, version):
+        """ 图的构建版本改变时清空缓存 """
+        with self._lock:
+            if version != self.version:
+                self._data.clear()
+                self.version = version
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self) -> dict:
+        """ 返回缓存的统计信息 """
+        total = self.hits + self.misses
+        return {'size': len(self._data), 'maxsize': self.maxsize,
+                'hits': self.hits, 'misses': self.misses,
+                'hit_ratio': self.hits / total if total else 0.0}
@@ -1,8 +1,47 @@
 # 解析器翻译链
+import re
+
+
+class Cypher:
+    """ 参数化的查询语句，值为None的参数为占位参数，由前一链的结果填充。
+        关系类型不能作为参数，模板中反引号内的参数（如[r:`$i`]）以其值写入语句，使查询仍按关系类型展开。
+    """
+
+    def __init__(self, query: str, **params):
+        self.template = query
+        self.params = params
+        self.query = query
+        if '`$' in query:
+            self.query = re.sub(r'`\$(\w+)`', lambda m: _quote(params[m.group(1)]), query)
+
+    def format(self, *values):
+        """ 按顺序将values填入占位参数，返回新的查询语句 """
+        values = iter(values)
+        params = {k: next(values) if v is None else v for k, v in self.params.items()}
+        return Cypher(self.template, **params)
+
+    @property
+    def key(self) -> tuple:
+        """ 由语句与参数组成的键，用于缓存查询结果 """
+        return self.query, tuple(sorted(self.params.items()))
+
+    @classmethod
+    def unwind(cls, sqls: list):
+        """ 将模板相同的多条查询合并为一条UNWIND查询，结果中的_i列为其在sqls中的位置 """
+        query = re.sub(r'\$(\w+)', r'p.\1', sqls[0].query).replace(' return ', ' return p._i as _i,', 1)
+        params = [dict(sql.params, _i=i) for i, sql in enumerate(sqls)]
+        return cls('unwind $params as p ' + query, params=params)
+
+    def __repr__(self):
+        return f'{self.query} {self.params}'
+
+
+def _quote(name) -> str:
+    return '`' + str(name).replace('`', '``') + '`'
 
 
 class TranslationChain:
-    """ 按照sql语句的执行顺序串成链, 后链需前一链的结果作为输入({}为其占位符)。"""
+    """ 按照sql语句的执行顺序串成链, 后链需前一链的结果作为输入(值为None的参数为其占位符)。"""
 
     def __init__(self):
         self._chain = {}
@@ -26,5 +65,15 @@ class TranslationChain:
         for sql in gen:
             yield sql
 
+    def leaves(self, offset: int = 0):
+        """ 迭代某一层中参数已确定（无占位参数）的全部查询 """
+        stack = [self._chain.get(offset, [])]
+        while stack:
+            item = stack.pop()
+            if isinstance(item, list):
+                stack.extend(reversed(item))
+            elif isinstance(item, Cypher) and None not in item.params.values():
+                yield item
+
     def __repr__(self):
         return str(self._chain)
@@ -0,0 +1,87 @@
+# web app中图表的暂存
+import json
+import time
+import sqlite3
+import hashlib
+from contextlib import closing
+
+from lib.cache import LRUCache
+from const import CHART_STORE, CHART_STORE_PATH, CHART_STORE_SIZE, CHART_STORE_TTL
+
+
+class ChartStore:
+    """ 以令牌保存一次回答的各图表配置（JSON字符串），有容量上限与存活时间。
+        令牌由图表配置的内容生成，相同的图表得到相同的令牌，也可作为ETag使用。
+    """
+
+    def __init__(self, maxsize: int = CHART_STORE_SIZE, ttl: float = CHART_STORE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+
+    def save(self, charts: list) -> str:
+        """ 保存图表配置，返回令牌 """
+        token = hashlib.sha1('\0'.join(charts).encode('utf-8')).hexdigest()
+        self.put(token, charts)
+        return token
+
+    def put(self, token: str, charts: list):
+        raise NotImplementedError
+
+    def get(self, token: str):
+        """ 返回令牌对应的图表配置列表，不存在或已过期时返回None """
+        raise NotImplementedError
+
+
+class MemoryChartStore(ChartStore):
+    """ 进程内的图表暂存，只适用于单进程（可多线程）的服务 """
+
+    def __init__(self, maxsize: int = CHART_STORE_SIZE, ttl: float = CHART_STORE_TTL):
+        super().__init__(maxsize, ttl)
+        self._cache = LRUCache(maxsize, ttl)
+
+    def put(self, token: str, charts: list):
+        self._cache.put(token, list(charts))
+
+    def get(self, token: str):
+        return self._cache.get(token)
+
+
+class SQLiteChartStore(ChartStore):
+    """ 基于本地SQLite文件的图表暂存，同一机器上的多个进程可共享 """
+
+    def __init__(self, path: str = CHART_STORE_PATH, maxsize: int = CHART_STORE_SIZE, ttl: float = CHART_STORE_TTL):
+        super().__init__(maxsize, ttl)
+        self.path = path
+        with closing(self._connect()) as conn, conn:
+            conn.execute('pragma journal_mode=wal')
+            conn.execute('create table if not exists charts '
+                         '(token text primary key, created real not null, charts text not null)')
+            conn.execute('create index if not exists charts_created on charts (created)')
+
+    def _connect(self) -> sqlite3.Connection:
+        # 每次操作使用新的连接，可在多线程中使用；连接作为上下文只提交事务，用完需以closing关闭
+        return sqlite3.connect(self.path, timeout=10)
+
+    def put(self, token: str, charts: list):
+        now = time.time()
+        with closing(self._connect()) as conn, conn:
+            conn.execute('insert or replace into charts values (?, ?, ?)', (token, now, json.dumps(charts)))
+            # 淘汰过期的与超出容量的最早的记录
+            if self.ttl is not None:
+                conn.execute('delete from charts where created < ?', (now - self.ttl,))
+            conn.execute('delete from charts where token not in '
+                         '(select token from charts order by created desc limit ?)', (self.maxsize,))
+
+    def get(self, token: str):
+        with closing(self._connect()) as conn:
+            row = conn.execute('select created, charts from charts where token = ?', (token,)).fetchone()
+        if row is None or (self.ttl is not None and row[0] < time.time() - self.ttl):
+            return None
+        return json.loads(row[1])
+
+
+def make_chart_store(store: str = CHART_STORE) -> ChartStore:
+    """ 按配置创建图表暂存 """
+    if store == 'sqlite':
+        return SQLiteChartStore()
+    return MemoryChartStore()
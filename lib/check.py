@@ -1,7 +1,8 @@
 # 问题的检查
-import re
 from types import FunctionType
 
+from lib.regexp import findall
+
 __all__ = ['check_contain', 'check_all_contain', 'check_list_contain', 'check_list_any_contain',
            'check_regexp', 'check_endswith']
 
@@ -49,13 +50,13 @@ def check_regexp(question: str, *patterns: str, functions: list, callback: Funct
     """ 检查正则关系
 
     :param question: 问题
-    :param patterns: 正则表达式
+    :param patterns: 预编译的正则表达式
     :param functions: 为每个正则表达式的匹配结果调用
     :param callback: 在function调用后结果为假时使用
     :return: 假值 或 真值
     """
     for pattern, function in zip(patterns, functions):
-        results = re.compile(pattern).findall(question)
+        results = findall(pattern, question)
         if results:
             value = function(results)
             if not value:
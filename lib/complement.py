@@ -1,10 +1,8 @@
 # 问题的填充
 import re
 
-import Levenshtein
-
 from lib.utils import read_words
-from lib.regexp import RangeYear, RefsYear
+from lib.regexp import RangeYear, RefsYear, findall
 from lib.mapping import map_digits, map_refs
 
 
@@ -24,7 +22,7 @@ def year_complement(question: str) -> str:
     complemented = question
 
     # 先填充范围
-    range_years = re.compile(RangeYear).findall(question)
+    range_years = findall(RangeYear, question)
     last_year = ''
     for (year, gap) in range_years:
         year = year.strip('年')
@@ -39,7 +37,7 @@ def year_complement(question: str) -> str:
 
     # 后填充指代
     for i, pattern in enumerate(RefsYear):
-        ref_years = re.compile(pattern).findall(complemented)
+        ref_years = findall(pattern, complemented)
         if ref_years:
             year = ref_years[0][-1]
             new_year = map_refs(year, i, int(last_year))
@@ -49,6 +47,53 @@ def year_complement(question: str) -> str:
     return complemented
 
 
+class IndexMatcher:
+    """ 指标名词的模糊匹配器，构建一次后可重复使用。
+        按长度分桶，利用 ratio <= 2*min(l1,l2)/(l1+l2) 的上界由近及远扫描各桶，
+        上界低于当前最高分或阈值时提前结束，结果与逐词计算完全一致。
+    """
+
+    def __init__(self, words: list, charset: str):
+        self.words = words
+        self.word_set = set(words)
+        self.pattern = re.compile(f'([{charset}]+)')
+        self.buckets = {}  # 长度: [(序号, 词)]
+        for i, word in enumerate(words):
+            self.buckets.setdefault(len(word), []).append((i, word))
+
+    @staticmethod
+    def bound(l1: int, l2: int) -> float:
+        """ 两个长度的字符串所能达到的最高匹配率 """
+        return 2 * min(l1, l2) / (l1 + l2)
+
+    def best(self, result: str, ratio_threshold: float) -> tuple:
+        """ 返回(最高分, 序号)，与max(scores)和scores.index相同，即同分时取靠前的词 """
+        import Levenshtein  # 只有模糊匹配用到，首次匹配时才导入
+
+        n = len(result)
+        best_score, best_i = -1.0, -1
+        for length in sorted(self.buckets, key=lambda l: -self.bound(l, n)):
+            # 浮点误差留有余量，保证不会漏掉同分的词
+            if self.bound(length, n) + 1e-9 < max(best_score, ratio_threshold):
+                break
+            for i, word in self.buckets[length]:
+                score = Levenshtein.ratio(word, result)
+                if score > best_score or (score == best_score and i < best_i):
+                    best_score, best_i = score, i
+        return best_score, best_i
+
+    def match(self, question: str, len_threshold: int = 4, ratio_threshold: float = 0.5) -> tuple:
+        """ 同index_complement，返回首次匹配结果 """
+        for result in self.pattern.findall(question):
+            if len(result) < len_threshold or result in self.word_set:
+                continue
+            # 得分最高的最近似
+            max_score, i = self.best(result, ratio_threshold)
+            if max_score >= ratio_threshold:
+                return self.words[i], result
+        return None, None
+
+
 def index_complement(question: str, words: list,
                      len_threshold: int = 4,
                      ratio_threshold: float = 0.5) -> tuple:
@@ -61,17 +106,4 @@ def index_complement(question: str, words: list,
     :return: 首次匹配结果
     """
     charset = read_words('./data/dicts/fast_index_table.txt')[0]
-    pattern = re.compile(f'([{charset}]+)')
-
-    for result in pattern.findall(question):
-        if len(result) < len_threshold or result in words:
-            continue
-        scores = []
-        for word in words:
-            score = Levenshtein.ratio(word, result)
-            scores.append(score)
-        # 得分最高的最近似
-        max_score = max(scores)
-        if max_score >= ratio_threshold:
-            return words[scores.index(max_score)], result
-    return None, None
+    return IndexMatcher(words, charset).match(question, len_threshold, ratio_threshold)
@@ -0,0 +1,108 @@
+# 年份×指标×地区的数值立方
+import pickle
+
+import numpy as np
+
+from lib.formatter import Formatter
+
+
+class ValueCube:
+    """ 以年份×指标×地区组织的值关系，地区轴的第0位为不涉及地区的指标值。
+        values中缺失或非数值的记录为NaN，units/reprs/raws为与之平行的单位、表示和原始值。
+        version为导出时图的构建版本，与图的版本不同时不再可用。
+    """
+
+    def __init__(self, years: list, indexes: list, areas: list, version: str = ''):
+        self.version = version
+        self.years = {y: i for i, y in enumerate(years)}
+        self.indexes = {n: i for i, n in enumerate(indexes)}
+        self.areas = {a: i for i, a in enumerate([''] + list(areas))}
+        shape = (len(self.years), len(self.indexes), len(self.areas))
+        self.values = np.full(shape, np.nan)
+        self.units = np.full(shape, '', dtype=object)
+        self.reprs = np.full(shape, '', dtype=object)
+        self.raws = np.full(shape, '', dtype=object)
+        self.missing = np.ones(shape, dtype=bool)
+
+    @classmethod
+    def from_rels(cls, rels_values: list, version: str = ''):
+        """ 由构建知识图谱时收集的值关系生成，version为此次构建的版本 """
+        rels = [(prefix, year, dst, attrs) for prefix, year, dst, attrs in rels_values if prefix != 'Y-C']
+        years = sorted(set(r[1] for r in rels))
+        indexes = sorted(set(r[2] if r[0] == 'Y-I' else r[3]['name'] for r in rels))
+        areas = sorted(set(r[2] for r in rels if r[0] == 'Y-A'))
+        cube = cls(years, indexes, areas, version)
+        for prefix, year, dst, attrs in rels:
+            if prefix == 'Y-I':
+                cube.put(year, dst, '', attrs)
+            else:
+                cube.put(year, attrs['name'], dst, attrs)
+        return cube
+
+    @staticmethod
+    def load(path: str):
+        with open(path, 'rb') as f:
+            cube = pickle.load(f)
+        cube.__dict__.setdefault('version', '')  # 旧版本导出的文件没有构建版本
+        return cube
+
+    def save(self, path: str):
+        with open(path, 'wb') as f:
+            pickle.dump(self, f)
+
+    def put(self, year: str, index: str, area: str, attrs: dict):
+        """ 记录一个值，与图中的关系属性一样原始值保存为字符串 """
+        pos = (self.years[year], self.indexes[index], self.areas[area])
+        raw = str(attrs.get('value'))
+        try:
+            self.values[pos] = float(raw)
+        except ValueError:
+            self.values[pos] = np.nan
+        self.raws[pos] = raw
+        self.units[pos] = None if attrs.get('unit') is None else str(attrs['unit'])
+        self.reprs[pos] = None if attrs.get('repr') is None else str(attrs['repr'])
+        self.missing[pos] = False
+
+    def _slice(self, years: list, index: str, area: str = ''):
+        """ 返回(年份位置, 指标位置, 地区位置)，不存在的年份位置为None """
+        return ([self.years.get(y) for y in years],
+                self.indexes.get(index),
+                self.areas.get(area or ''))
+
+    def series(self, years: list, index: str, area: str = '') -> tuple:
+        """ 某指标(地区)在多个年份的值与单位，缺失或非数值记为0，缺失的单位记为'' """
+        ys, i, a = self._slice(years, index, area)
+        found = [y for y in ys if y is not None]
+        values = np.zeros(len(years))
+        units = [''] * len(years)
+        if i is None or a is None or not found:
+            return values, units
+        pos = [k for k, y in enumerate(ys) if y is not None]
+        values[pos] = np.nan_to_num(self.values[found, i, a])
+        for k, unit in zip(pos, self.units[found, i, a]):
+            units[k] = unit
+        return values, units
+
+    def growth(self, year: str, last_year: str, indexes: list, area: str = '') -> np.ndarray:
+        """ 多个指标的同比增长率(%)，无法计算时为NaN """
+        y, ly, a = self.years.get(year), self.years.get(last_year), self.areas.get(area or '')
+        rates = np.full(len(indexes), np.nan)
+        if y is None or ly is None or a is None:
+            return rates
+        pos = [k for k, n in enumerate(indexes) if n in self.indexes]
+        cols = [self.indexes[indexes[k]] for k in pos]
+        this, last = self.values[y, cols, a], self.values[ly, cols, a]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rates[pos] = (this - last) / last * 100
+        rates[~np.isfinite(rates)] = np.nan
+        return rates
+
+    def record(self, year: str, index: str, area: str = '') -> Formatter:
+        """ 以查询结果的形式返回某个值 """
+        y, i, a = self.years.get(year), self.indexes.get(index), self.areas.get(area or '')
+        if y is None or i is None or a is None or self.missing[y, i, a]:
+            return Formatter(None)
+        data = {'r.value': self.raws[y, i, a], 'r.unit': self.units[y, i, a]}
+        if a != 0:
+            data['r.repr'] = self.reprs[y, i, a]
+        return Formatter(data)
@@ -1,23 +1,47 @@
 # 格式化sql查询结果
-import pickle
+from functools import lru_cache
+
+from lib.life import life_codes
+
+
+@lru_cache(maxsize=256)
+def _dispatch(keys: tuple) -> tuple:
+    """ 将查询结果的列名映射为字段名，同一组列名只解析一次，无对应字段的列为None """
+    fields = []
+    for k in keys:
+        if k.endswith('name'):
+            fields.append('name')
+        elif k.endswith('area'):
+            fields.append('area')
+        elif k.endswith('info'):
+            fields.append('info')
+        elif k.endswith('value'):
+            fields.append('value')
+        elif k.endswith('unit'):
+            fields.append('unit')
+        elif k.endswith('life'):
+            fields.append('life')
+        elif k.endswith('repr'):
+            fields.append('repr')
+        elif k.startswith('label'):
+            fields.append('label')
+        elif k.endswith('child_id'):
+            fields.append('child_id')
+        else:
+            fields.append(None)
+    return tuple(fields)
 
 
 class Formatter:
 
+    __slots__ = ('_is_none', 'name', 'area', 'info', 'value', 'unit', 'life', 'repr', 'label', 'child_id')
+
     def __init__(self, data):
-        self._life_path = './data/dicts/life.pk'
         # flags
         self._is_none = (data is None or len(data) == 0)
-        # fields
-        self.name = ''  # index_name
-        self.area = ''
-        self.info = ''
-        self.value = ''
-        self.unit = ''
-        self.life = ''
-        self.repr = ''
-        self.label = ''
-        self.child_id = ''
+        # fields（name即index_name）
+        self.name = self.area = self.info = self.value = self.unit = ''
+        self.life = self.repr = self.label = self.child_id = ''
         # init
         self._distribute(data)
 
@@ -25,25 +49,11 @@ class Formatter:
         """ 将传入的数据字段分散为各个字段 """
         if self._is_none:
             return
-        for k, v in data.items():
-            if k.endswith('name'):
-                self.name = v
-            elif k.endswith('area'):
-                self.area = v
-            elif k.endswith('info'):
-                self.info = v
-            elif k.endswith('value'):
-                self.value = v
-            elif k.endswith('unit'):
-                self.unit = v
-            elif k.endswith('life'):
+        for field, v in zip(_dispatch(tuple(data)), data.values()):
+            if field == 'life':
                 self.life = int(v)
-            elif k.endswith('repr'):
-                self.repr = v
-            elif k.startswith('label'):
-                self.label = v
-            elif k.endswith('child_id'):
-                self.child_id = v
+            elif field is not None:
+                setattr(self, field, v)
 
     def __repr__(self):
         return f'<name:{self.name} info:{self.info} value:{self.value} unit:{self.unit}' \
@@ -56,11 +66,8 @@ class Formatter:
         """ 检查并剔除不在生命周期中的数据 """
         if self._is_none:
             return
-        with open(self._life_path, 'rb') as f:
-            life = pickle.load(f)
-            year = life.get_life(year)
-            if life.live(year, self.life) == 0:
-                self._is_none = True
+        if not life_codes().get(year, 0) & self.life:
+            self._is_none = True
 
     def subject(self):
         """ 获取主语 """
@@ -1,4 +1,12 @@
 # 为知识图谱结构关系编码/解码生命周期
+import pickle
+import threading
+from types import MappingProxyType
+
+from const import LIFE_PATH
+
+_life_codes = None  # 进程内共享的 年份: 编码 表
+_life_lock = threading.Lock()
 
 
 class Life:
@@ -18,6 +26,10 @@ class Life:
         code = self._code.get(obj)
         return code if code is not None else 0
 
+    def codes(self) -> dict:
+        """ 返回全部编码的副本 """
+        return dict(self._code)
+
     @staticmethod
     def live(year, life) -> bool:
         """ 返回输入year编码是否还存在生命 """
@@ -27,3 +39,14 @@ class Life:
     def extend_life(life, code):
         """ 延续生命周期，code为延续时长编码 """
         return life + code
+
+
+def life_codes() -> MappingProxyType:
+    """ 返回只读的 年份: 编码 表，首次调用时载入生命周期编码，此后各处共享 """
+    global _life_codes
+    if _life_codes is None:
+        with _life_lock:
+            if _life_codes is None:
+                with open(LIFE_PATH, 'rb') as f:
+                    _life_codes = MappingProxyType(pickle.load(f).codes())
+    return _life_codes
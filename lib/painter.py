@@ -1,10 +1,7 @@
-# 图表绘制器
+# 图表绘制器（pyecharts导入较慢，在首次绘制时才导入）
 import os
 
-from pyecharts.charts import Bar, Pie, Line
-from pyecharts import options as opts
-from pyecharts.globals import ThemeType
-
+from lib.trace import tracer
 from const import CHART_RENDER_DIR
 
 
@@ -14,7 +11,12 @@ class Painter:
         if not os.path.exists(CHART_RENDER_DIR):
             os.mkdir(CHART_RENDER_DIR)
 
+    @tracer.traced('paint')
     def paint_bar(self, x: list, collects: list, title: str,  mark_point: bool = False):
+        from pyecharts.charts import Bar
+        from pyecharts import options as opts
+        from pyecharts.globals import ThemeType
+
         bar = Bar(init_opts=opts.InitOpts(theme=ThemeType.LIGHT))
         bar.add_xaxis(x)
         for collect in collects:
@@ -51,7 +53,11 @@ class Painter:
             )
         return bar
 
+    @tracer.traced('paint')
     def paint_pie(self, data_pairs: list, units: list, title: str, sub_titles: list):
+        from pyecharts.charts import Pie
+        from pyecharts import options as opts
+
         old_i = i = 10
         j = 60
         for data_pair, unit, sub_title in zip(data_pairs, units, sub_titles):
@@ -80,7 +86,12 @@ class Painter:
             i = old_i
             yield pie
 
+    @tracer.traced('paint')
     def paint_bar_stack_with_line(self, x: list, children: dict, parents: dict, sub_title: str):
+        from pyecharts.charts import Bar, Line
+        from pyecharts import options as opts
+        from pyecharts.globals import ThemeType
+
         for (parent_name, unit), item in children.items():
             bar = Bar(init_opts=opts.InitOpts(theme=ThemeType.MACARONS))
             bar.add_xaxis(x)
@@ -126,7 +137,11 @@ class Painter:
             bar.overlap(line)
             yield bar
 
+    @tracer.traced('paint')
     def paint_line(self, x: list, tag: str, y: list, title: str):
+        from pyecharts.charts import Line
+        from pyecharts import options as opts
+
         line = Line()
         line.add_xaxis(x)
         line.add_yaxis(tag, y)
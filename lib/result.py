@@ -46,6 +46,11 @@ class Result(object):
     def add_sql(self, qt: str, sqls: TranslationChain):
         self.sqls[qt] = sqls
 
+    def semantic_key(self) -> tuple:
+        """ 问题的规范形式：按类型分组的特征词（同类型内保持问句中的顺序）及问题类型 """
+        return (tuple(sorted((t, tuple(ws)) for t, ws in self.region_wds_reverse.items())),
+                tuple(self.question_types))
+
     def reverse_region_dict(self):
         # 转换值为键
         new_dict = {}
@@ -0,0 +1,168 @@
+# 各阶段的耗时与计数
+import json
+import time
+import inspect
+import threading
+from functools import wraps
+from contextlib import contextmanager
+
+from const import TRACE_PATH, TRACE_BUCKETS
+
+METRIC_PREFIX = 'cakg_'
+
+
+class Span:
+    """ 一个阶段的一次执行，labels用于汇总直方图，attrs只记录在trace中 """
+
+    __slots__ = ('name', 'labels', 'attrs', 'start', 'ms', 'children')
+
+    def __init__(self, name: str, labels: dict, attrs: dict):
+        self.name = name
+        self.labels = labels
+        self.attrs = attrs
+        self.start = time.time()
+        self.ms = 0.0
+        self.children = []
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def to_dict(self) -> dict:
+        return {'name': self.name, 'start': self.start, 'ms': round(self.ms, 3),
+                'labels': self.labels, 'attrs': self.attrs,
+                'children': [child.to_dict() for child in self.children]}
+
+
+class Tracer:
+    """ 记录各阶段的span，汇总为Prometheus格式的直方图与计数器。
+        同一线程中嵌套的span（及显式指定parent的span）组成一棵树，最外层的span结束时整棵树作为一行JSON写入path（为None时不写）。
+    """
+
+    def __init__(self, path: str = TRACE_PATH, buckets: tuple = TRACE_BUCKETS):
+        self.path = path
+        self.buckets = buckets  # 直方图的上界（秒）
+        self.counters = {}  # (name, labels): value
+        self.gauges = {}  # (name, labels): value
+        self.histograms = {}  # (stage, labels): [各桶计数..., 总和, 次数]
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def _stack(self) -> list:
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    @contextmanager
+    def span(self, name: str, labels: dict = None, parent: Span = None, **attrs):
+        """ parent缺省为当前线程最内层的span；在线程池中执行的子阶段需显式传入调用方的span """
+        stack = self._stack()
+        if parent is None:
+            parent = stack[-1] if stack else None
+        span = Span(name, labels or {}, attrs)
+        stack.append(span)
+        start = time.perf_counter()
+        try:
+            yield span
+        finally:
+            span.ms = (time.perf_counter() - start) * 1000
+            stack.pop()
+            self.observe(name, span.ms / 1000, **span.labels)
+            if parent is not None:
+                with self._lock:  # 多个线程中的子阶段可能同时结束
+                    parent.children.append(span)
+            elif self.path is not None:
+                self.export(span)
+
+    def traced(self, name: str):
+        """ 以span记录函数的每次调用，生成器函数在span中生成全部元素后再逐个返回 """
+        def decorator(func):
+            if inspect.isgeneratorfunction(func):
+                @wraps(func)
+                def generator(*args, **kwargs):
+                    with self.span(name):
+                        items = list(func(*args, **kwargs))
+                    yield from items
+                return generator
+
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.span(name):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def current(self):
+        """ 当前线程最内层的span，没有时为None """
+        stack = self._stack()
+        return stack[-1] if stack else None
+
+    def incr(self, name: str, value: float = 1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def gauge(self, name: str, value: float, **labels):
+        with self._lock:
+            self.gauges[(name, tuple(sorted(labels.items())))] = value
+
+    def observe(self, stage: str, seconds: float, **labels):
+        key = (stage, tuple(sorted(labels.items())))
+        with self._lock:
+            hist = self.histograms.get(key)
+            if hist is None:
+                hist = self.histograms[key] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    hist[i] += 1
+            hist[-2] += seconds
+            hist[-1] += 1
+
+    def export(self, span: Span):
+        line = json.dumps(span.to_dict(), ensure_ascii=False)
+        with self._lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line + '\n')
+
+    def reset(self):
+        with self._lock:
+            self.counters.clear()
+            self.gauges.clear()
+            self.histograms.clear()
+
+    def prometheus(self) -> str:
+        """ 以Prometheus文本格式导出 """
+        lines = []
+        with self._lock:
+            counters = sorted(self.counters.items())
+            gauges = sorted(self.gauges.items())
+            histograms = sorted(self.histograms.items())
+        for kind, items in (('counter', counters), ('gauge', gauges)):
+            typed = set()
+            for (name, labels), value in items:
+                metric = METRIC_PREFIX + name
+                if metric not in typed:
+                    lines.append(f'# TYPE {metric} {kind}')
+                    typed.add(metric)
+                lines.append(f'{metric}{_labels(labels)} {value}')
+        metric = METRIC_PREFIX + 'stage_seconds'
+        if histograms:
+            lines.append(f'# TYPE {metric} histogram')
+        for (stage, labels), hist in histograms:
+            labels = (('stage', stage),) + labels
+            for bound, count in zip(self.buckets, hist):
+                lines.append(f'{metric}_bucket{_labels(labels + (("le", repr(float(bound))),))} {count}')
+            lines.append(f'{metric}_bucket{_labels(labels + (("le", "+Inf"),))} {hist[-1]}')
+            lines.append(f'{metric}_sum{_labels(labels)} {hist[-2]}')
+            lines.append(f'{metric}_count{_labels(labels)} {hist[-1]}')
+        return '\n'.join(lines) + '\n'
+
+
+def _labels(labels: tuple) -> str:
+    if not labels:
+        return ''
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, v in labels)
+    return '{' + ','.join(f'{k}="{v}"' for (k, _), v in zip(labels, escaped)) + '}'
+
+
+tracer = Tracer()  # 进程内共享
@@ -1,23 +1,62 @@
 # 问题分类器
+from glob import glob
+
 import ahocorasick
 
 from lib.check import *
 from lib.regexp import *
 from lib.result import Result
+from lib.artifact import checksum, load_artifact, save_artifact
 from lib.utils import read_words, debug
-from lib.complement import year_complement, index_complement
+from lib.complement import year_complement, IndexMatcher
 from lib.errors import QuestionOrderError
+from lib.trace import tracer
+from const import CLASSIFIER_PATH, CLASSIFIER_VERSION
 
 
 class QuestionClassifier:
 
-    def __init__(self):
+    # 预编译数据中保存的属性
+    compiled_fields = ('word_type_dict', 'area_wds', 'catalog_wds', 'index_wds', 'year_wds',
+                       'exist_qwds', 'value_qwds', 'when_qwds',
+                       'status_rwds', 'catalog_rwds', 'parent_index_rwds', 'child_index_rwds',
+                       'location_rwds', 'index_rwds', 'max_rwds', 'is_twds',
+                       'region_wds', 'region_tree', 'word_tree', 'index_matcher')
+    # 由word_tree统一匹配的疑问词、指代词与尾词表
+    word_list_fields = ('exist_qwds', 'value_qwds', 'when_qwds',
+                        'status_rwds', 'catalog_rwds', 'parent_index_rwds', 'child_index_rwds',
+                        'location_rwds', 'index_rwds', 'max_rwds', 'is_twds')
+
+    def __init__(self, artifact_path: str = CLASSIFIER_PATH):
         # 词根目录
         self.region_wds_root = './data/dicts/{}.txt'
         self.qwds_root = './data/question/{}.txt'
         self.rwds_root = './data/reference/{}.txt'
         self.twds_root = './data/tail/{}.txt'
 
+        # 优先载入预编译数据，词表有变动时重新构建并更新；artifact_path为None时直接由词表构建
+        if artifact_path is None:
+            self.compile()
+            return
+        sources = checksum(self.source_files())
+        compiled = load_artifact(artifact_path, CLASSIFIER_VERSION, sources)
+        if compiled is None:
+            debug('||CLASSIFIER REBUILD||', artifact_path)
+            self.compile()
+            try:
+                self.save(artifact_path, sources)
+            except OSError:
+                pass
+        else:
+            self.__dict__.update(compiled)
+
+    def source_files(self) -> list:
+        """ 构建分类器所依赖的词表文件 """
+        roots = (self.region_wds_root, self.qwds_root, self.rwds_root, self.twds_root)
+        return [path for root in roots for path in glob(root.format('*'))]
+
+    def compile(self):
+        """ 由词表构建分类器 """
         self.word_type_dict = {}
         # 特征词
         self.area_wds = self.read_region_words('area')
@@ -44,6 +83,15 @@ class QuestionClassifier:
 
         self.region_wds = set(self.area_wds + self.catalog_wds + self.index_wds + self.year_wds)
         self.region_tree = self.build_actree()
+        self.word_tree = self.build_word_tree()
+        self.index_matcher = IndexMatcher(self.index_wds, read_words(self.region_wds_root.format('fast_index_table'))[0])
+
+    def save(self, artifact_path: str = CLASSIFIER_PATH, sources: str = None):
+        """ 保存预编译数据（自动机、词类型字典与各词表） """
+        if sources is None:
+            sources = checksum(self.source_files())
+        save_artifact(artifact_path, CLASSIFIER_VERSION, sources,
+                      {field: getattr(self, field) for field in self.compiled_fields})
 
     def read_region_words(self, word_type: str) -> list:
         """ 加载特征词并构建特征词类型字典 """
@@ -62,6 +110,27 @@ class QuestionClassifier:
         actree.make_automaton()
         return actree
 
+    def build_word_tree(self):
+        """ 将各词表合并为一个自动机，每个词标记其所属的词表 """
+        word_fields = {}
+        for field in self.word_list_fields:
+            for word in getattr(self, field):
+                if word:
+                    word_fields.setdefault(word, set()).add(field)
+        actree = ahocorasick.Automaton()
+        for word, fields in word_fields.items():
+            actree.add_word(word, frozenset(fields))
+        actree.make_automaton()
+        return actree
+
+    def scan_words(self, text: str) -> set:
+        """ 扫描一次文本，返回其中出现过的词表名称的集合 """
+        hits = set()
+        for _, fields in self.word_tree.iter(text):
+            hits |= fields
+        return hits
+
+    @tracer.traced('question_filter')
     def question_filter(self, question: str) -> Result:
         question = question.replace(' ', '')
         # 过滤年份
@@ -74,14 +143,16 @@ class QuestionClassifier:
 
         return Result(region_dict, question, filtered_question)
 
+    @tracer.traced('index_complement')
     def extract_index(self, result: Result, len_threshold: int = 4, ratio_threshold: float = 0.5):
         """ 提取因错别字或说法而未识别到的指标 """
-        new_word, old_word = index_complement(result.filtered_question, self.index_wds, len_threshold, ratio_threshold)
+        new_word, old_word = self.index_matcher.match(result.filtered_question, len_threshold, ratio_threshold)
         if new_word:
             debug('||REPLACE FOUND||', new_word, '<=', old_word)
             result.add_word(new_word, self.word_type_dict.get(new_word))
             result.replace_words(old_word, new_word)
 
+    @tracer.traced('classify')
     def classify(self, question: str):
         result = self.question_filter(question)
         if result.count('index') == 0 and 'catalog' not in result:
@@ -94,31 +165,33 @@ class QuestionClassifier:
         debug('||QUESTION TYPES||', result.question_types)
         return result
 
+    @tracer.traced('classify_tree')
     def _classify_tree(self, result: Result):
         # 收集实体类型
         question = result.filtered_question
+        hits = self.scan_words(question)  # 问题中出现的疑问词、指代词所属的词表
         year_count = result.count('year')
 
         # 问题与单个年份相关
         if year_count == 1:
             # 全年总体情况
-            if check_contain(self.status_rwds, question) and 'year' in result and len(result) == 1:
+            if 'status_rwds' in hits and 'year' in result and len(result) == 1:
                 result.add_qtype('year_status')
             # 全年含有目录
-            if check_contain(self.exist_qwds, question) and check_contain(self.catalog_rwds, question):
+            if 'exist_qwds' in hits and 'catalog_rwds' in hits:
                 result.add_qtype('exist_catalog')
 
             # 目录
             if 'catalog' in result:
                 # 总体情况
-                if check_contain(self.status_rwds, question):
+                if 'status_rwds' in hits:
                     result.add_qtype('catalog_status')
 
             # 指标
             if 'index' in result:
                 # 值
-                if check_contain(self.value_qwds, question) or check_endswith(self.is_twds, question):
-                    if not check_contain(self.child_index_rwds, question):
+                if 'value_qwds' in hits or check_endswith(self.is_twds, question):
+                    if 'child_index_rwds' not in hits:
                         # 涉及地区
                         if 'area' in result:
                             result.add_qtype('area_value')
@@ -126,7 +199,7 @@ class QuestionClassifier:
                             result.add_qtype('index_value')
                 # 值比较(上级)
                 if check_regexp(question, MultipleCmp1,
-                                functions=[lambda x: check_contain(self.parent_index_rwds, x[0][-1])],
+                                functions=[lambda x: 'parent_index_rwds' in self.scan_words(x[0][-1])],
                                 callback=lambda x: QuestionOrderError.check(x, self.parent_index_rwds)
                                 ):
                     # 涉及地区
@@ -138,6 +211,7 @@ class QuestionClassifier:
                 if result.count('index') < 2:
                     self.extract_index(result, ratio_threshold=0.7)
                     question = result.filtered_question  # 重新查询后更新
+                    hits = self.scan_words(question)
                 if result.count('index') == 2 and 'area' not in result:
                     if check_regexp(question, MultipleCmp1, functions=[
                         lambda x: check_list_contain(result['index'], x[0], 0, -1)
@@ -174,24 +248,24 @@ class QuestionClassifier:
                     else:
                         result.add_qtype('indexes_g_compare')
                 # 指标的组成
-                if check_contain(self.child_index_rwds, question):
+                if 'child_index_rwds' in hits:
                     result.add_qtype('index_compose')
 
         # 问题与两个年份相关
         elif year_count == 2:
             # 目录与指标的变化情况
             if result.count('year') == len(result):
-                if check_contain(self.catalog_rwds, question):
+                if 'catalog_rwds' in hits:
                     result.add_qtype('catalog_change')
-                elif check_contain(self.index_rwds, question):
+                elif 'index_rwds' in hits:
                     result.add_qtype('index_change')
 
             # 指标
             if 'index' in result:
-                if check_contain(self.parent_index_rwds, question):
+                if 'parent_index_rwds' in hits:
                     # 上级占比变化
                     if check_regexp(question, NumberCmp2[0], NumberCmp2[1], functions=[
-                        lambda x: check_contain(self.parent_index_rwds, x[0])
+                        lambda x: 'parent_index_rwds' in self.scan_words(x[0])
                     ]*2):
                         if 'area' not in result:
                             result.add_qtype('index_2_overall')
@@ -233,10 +307,10 @@ class QuestionClassifier:
         # 问题与多个年份相关
         elif year_count > 2:
             # 指标/目录变化趋势
-            if result.count('year') == len(result) and check_contain(self.status_rwds, question):
-                if check_contain(self.catalog_rwds, question):
+            if result.count('year') == len(result) and 'status_rwds' in hits:
+                if 'catalog_rwds' in hits:
                     result.add_qtype('catalogs_change')
-                elif check_contain(self.index_rwds, question):
+                elif 'index_rwds' in hits:
                     result.add_qtype('indexes_change')
 
             # 关于指标的变化趋势
@@ -244,21 +318,21 @@ class QuestionClassifier:
                 # 占上级的
                 if check_regexp(question, MultipleCmp1, functions=[
                     lambda x: (check_contain(result['index'], x[0][0]) and
-                               check_contain(self.status_rwds, x[0][-1]) and
-                               check_contain(self.parent_index_rwds, x[0][-1]))
+                               'status_rwds' in self.scan_words(x[0][-1]) and
+                               'parent_index_rwds' in self.scan_words(x[0][-1]))
                 ]):
                     if 'area' in result:
                         result.add_qtype('areas_overall_trend')
                     else:
                         result.add_qtype('indexes_overall_trend')
                 # 值的
-                if check_contain(self.status_rwds, question) and not check_contain(self.parent_index_rwds, question):
+                if 'status_rwds' in hits and 'parent_index_rwds' not in hits:
                     if 'area' in result:
                         result.add_qtype('areas_trend')
                     else:
                         result.add_qtype('indexes_trend')
                 # 最值
-                if check_contain(self.max_rwds, question):
+                if 'max_rwds' in hits:
                     if 'area' in result:
                         result.add_qtype('areas_max')
                     else:
@@ -266,5 +340,5 @@ class QuestionClassifier:
 
         # 问题与年份无关
         else:
-            if 'index' in result and check_contain(self.when_qwds, question):
+            if 'index' in result and 'when_qwds' in hits:
                 result.add_qtype('begin_stats')
@@ -1,29 +1,40 @@
 # 问题解析器
+import threading
 from copy import deepcopy
 
 from lib.result import Result
-from lib.chain import TranslationChain
+from lib.chain import Cypher, TranslationChain
 from lib.errors import QuestionYearOverstep
+from lib.trace import tracer
 
 
 class QuestionParser:
 
     def __init__(self):
-        self.chain = TranslationChain()
+        self._local = threading.local()  # 各线程的翻译链
 
         # 基本sql语句, 供翻译方法使用
-        self.sql_Y_status = 'match (y:Year) where y.name="{y}" return y.info'
-        self.sql_C_status = 'match (y:Year)-[r:info]->(c:Catalog) where y.name="{y}" and c.name="{c}" return r.info'
-        self.sql_I_value = 'match (y:Year)-[r:value]->(i:Index) where y.name="{y}" and i.name="{i}" return r.value,r.unit'
-        self.sql_A_value = 'match (y:Year)-[r:`{i}`]->(n:Area) where y.name="{y}" and n.name="{a}" return r.value,r.unit,r.repr'
-
-        self.sql_find_I_parent = 'match (n:Index)-[r:contain]->(m:Index) where m.name="{i}" return n.name,r.life'
-        self.sql_find_A_parent = 'match (n:Area)-[r:contain]->(m:Area) where m.name="{a}" return n.name,r.life'
-        self.sql_find_I_child = 'match (n:Index)-[r]->(m) where n.name="{i}" return m.name,labels(m)[0],r.life'
-        self.sql_find_Is = 'match (y:Year)-[r:value]->(i:Index) where y.name="{y}" return i.name'
-        self.sql_find_Cs = 'match (y:Year)-[r:include]->(c:Catalog) where y.name="{y}" return c.name'
-        self.sql_find_begin_stats_Ys = 'match (y:Year)-[r:value]->(i:Index) where i.name="{i}" return y.name'
-
+        self.sql_Y_status = 'match (y:Year) where y.name=$y return y.info'
+        self.sql_C_status = 'match (y:Year)-[r:info]->(c:Catalog) where y.name=$y and c.name=$c return r.info'
+        self.sql_I_value = 'match (y:Year)-[r:value]->(i:Index) where y.name=$y and i.name=$i return r.value,r.unit'
+        self.sql_A_value = 'match (y:Year)-[r:`$i`]->(n:Area) where y.name=$y and n.name=$a return r.value,r.unit,r.repr'
+
+        self.sql_find_I_parent = 'match (n:Index)-[r:contain]->(m:Index) where m.name=$i return n.name,r.life'
+        self.sql_find_A_parent = 'match (n:Area)-[r:contain]->(m:Area) where m.name=$a return n.name,r.life'
+        self.sql_find_I_child = 'match (n:Index)-[r]->(m) where n.name=$i return m.name,labels(m)[0],r.life'
+        self.sql_find_Is = 'match (y:Year)-[r:value]->(i:Index) where y.name=$y return i.name'
+        self.sql_find_Cs = 'match (y:Year)-[r:include]->(c:Catalog) where y.name=$y return c.name'
+        self.sql_find_begin_stats_Ys = 'match (y:Year)-[r:value]->(i:Index) where i.name=$i return y.name'
+
+    @property
+    def chain(self) -> TranslationChain:
+        """ 每个线程使用各自的翻译链，使同一解析器可被多个线程共用 """
+        chain = getattr(self._local, 'chain', None)
+        if chain is None:
+            chain = self._local.chain = TranslationChain()
+        return chain
+
+    @tracer.traced('parse')
     def parse(self, result: Result) -> Result:
         for qt in result.question_types:
             # 查询语句翻译
@@ -72,92 +83,92 @@ class QuestionParser:
 
     # 年度总体状况
     def trans_year_status(self, years):
-        self.chain.make([self.sql_Y_status.format(y=years[0])])
+        self.chain.make([Cypher(self.sql_Y_status, y=years[0])])
 
     # 年度目录状况
     def trans_catalog_status(self, years, catalogs):
-        self.chain.make([self.sql_C_status.format(y=years[0], c=c) for c in catalogs])
+        self.chain.make([Cypher(self.sql_C_status, y=years[0], c=c) for c in catalogs])
 
     # 指标变化情况
     def trans_index_change(self, years):
-        self.chain.make([self.sql_find_Is.format(y=y) for y in years])
+        self.chain.make([Cypher(self.sql_find_Is, y=y) for y in years])
 
     # 目录变化情况
     def trans_catalog_change(self, years):
-        self.chain.make([self.sql_find_Cs.format(y=y) for y in years])
+        self.chain.make([Cypher(self.sql_find_Cs, y=y) for y in years])
 
     # 年度目录包含哪些
     def trans_exist_catalog(self, years):
-        self.chain.make([self.sql_find_Cs.format(y=years[0])])
+        self.chain.make([Cypher(self.sql_find_Cs, y=years[0])])
 
     # 指标值
     def trans_index_value(self, years, indexes):
-        self.chain.make([self.sql_I_value.format(y=years[0], i=i) for i in indexes])
+        self.chain.make([Cypher(self.sql_I_value, y=years[0], i=i) for i in indexes])
 
     # 多个年份指标值变化趋势
     def trans_indexes_value(self, years, indexes):
-        self.chain.make([[self.sql_I_value.format(y=y, i=i) for y in years] for i in indexes])
+        self.chain.make([[Cypher(self.sql_I_value, y=y, i=i) for y in years] for i in indexes])
 
     # 两个年份下的指标值的各种比较
     def trans_indexes_mn_compare(self, years, indexes):
-        self.chain.make([[self.sql_I_value.format(y=y, i=i) for y in years] for i in indexes])
+        self.chain.make([[Cypher(self.sql_I_value, y=y, i=i) for y in years] for i in indexes])
 
     # 指标值同比比较
     def trans_indexes_g_compare(self, years, indexes):
-        last_year = int(years[0])-1
+        last_year = int(years[0]) - 1
         QuestionYearOverstep.check(last_year)
-        self.chain.make([[self.sql_I_value.format(y=last_year, i=i),
-                          self.sql_I_value.format(y=years[0], i=i)] for i in indexes])
+        self.chain.make([[Cypher(self.sql_I_value, y=str(last_year), i=i),
+                          Cypher(self.sql_I_value, y=years[0], i=i)] for i in indexes])
 
     # 指标占总比
     def trans_index_overall(self, years, indexes):
-        self.chain.make([self.sql_I_value.format(y=years[0], i=i) for i in indexes])\
-                  .then([self.sql_find_I_parent.format(i=i) for i in indexes])\
-                  .then([self.sql_I_value.format(y=years[0], i='{}')])
+        self.chain.make([Cypher(self.sql_I_value, y=years[0], i=i) for i in indexes])\
+                  .then([Cypher(self.sql_find_I_parent, i=i) for i in indexes])\
+                  .then([Cypher(self.sql_I_value, y=years[0], i=None)])
 
     # 两或多个年份指标占总比的变化
     def trans_indexes_overall(self, years, indexes):
-        self.chain.make([[self.sql_I_value.format(y=y, i=i) for y in years] for i in indexes])\
-                  .then([self.sql_find_I_parent.format(i=i) for i in indexes])\
-                  .then([self.sql_I_value.format(y=y, i='{}') for y in years])
+        self.chain.make([[Cypher(self.sql_I_value, y=y, i=i) for y in years] for i in indexes])\
+                  .then([Cypher(self.sql_find_I_parent, i=i) for i in indexes])\
+                  .then([Cypher(self.sql_I_value, y=y, i=None) for y in years])
 
     # 指标组成
     def trans_index_compose(self, years, indexes):
-        self.chain.make([self.sql_find_I_child.format(i=i) for i in indexes]) \
-                  .then([self.sql_I_value.format(y=years[0], i='{}') + ',r.child_id']) \
-                  .then([self.sql_A_value.format(y=years[0], i='{}', a='{}') + ',r.child_id']) \
-                  .then([self.sql_I_value.format(y=years[0], i=i) for i in indexes])  # overall
+        self.chain.make([Cypher(self.sql_find_I_child, i=i) for i in indexes]) \
+                  .then([Cypher(self.sql_I_value + ',r.child_id', y=years[0], i=None)]) \
+                  .then([Cypher(self.sql_A_value + ',r.child_id', y=years[0], i=None, a=None)]) \
+                  .then([Cypher(self.sql_I_value, y=years[0], i=i) for i in indexes])  # overall
 
     # 地区指标值
     def trans_area_value(self, years, areas, indexes):
-        self.chain.make([self.sql_A_value.format(y=years[0], i=i, a=a) for a in areas for i in indexes])
+        self.chain.make([Cypher(self.sql_A_value, y=years[0], i=i, a=a) for a in areas for i in indexes])
 
     def trans_areas_value(self, years, areas, indexes):
-        self.chain.make([[[self.sql_A_value.format(y=y, i=i, a=a) for y in years] for a in areas] for i in indexes])
+        self.chain.make([[[Cypher(self.sql_A_value, y=y, i=i, a=a) for y in years] for a in areas] for i in indexes])
 
     # 两个年份下地区的指标值的各种比较
     def trans_areas_mn_compare(self, years, areas, indexes):
-        self.chain.make([[[self.sql_A_value.format(y=y, a=a, i=i) for y in years] for a in areas] for i in indexes])
+        self.chain.make([[[Cypher(self.sql_A_value, y=y, a=a, i=i) for y in years] for a in areas] for i in indexes])
 
     # 地区指标值同比比较
     def trans_areas_g_compare(self, years, areas, indexes):
         last_year = int(years[0]) - 1
         QuestionYearOverstep.check(last_year)
-        self.chain.make([[self.sql_A_value.format(y=last_year, a=areas[0], i=i),
-                          self.sql_A_value.format(y=years[0], a=areas[0], i=i)] for i in indexes])
+        self.chain.make([[Cypher(self.sql_A_value, y=str(last_year), a=areas[0], i=i),
+                          Cypher(self.sql_A_value, y=years[0], a=areas[0], i=i)] for i in indexes])
 
     # 地区指标占总比
     def trans_area_overall(self, years, areas, indexes):
-        self.chain.make([self.sql_A_value.format(y=years[0], i=i, a=a) for a in areas for i in indexes])\
-                  .then([self.sql_find_A_parent.format(a=a) for a in areas])\
-                  .then([self.sql_A_value.format(y=years[0], i=i, a='{}') for i in indexes])
+        self.chain.make([Cypher(self.sql_A_value, y=years[0], i=i, a=a) for a in areas for i in indexes])\
+                  .then([Cypher(self.sql_find_A_parent, a=a) for a in areas])\
+                  .then([Cypher(self.sql_A_value, y=years[0], i=i, a=None) for i in indexes])
 
     # 地区两或多个年份指标占总比的变化
     def trans_areas_overall(self, years, areas, indexes):
-        self.chain.make([[[self.sql_A_value.format(y=y, i=i, a=a) for y in years] for a in areas] for i in indexes])\
-                  .then([self.sql_find_A_parent.format(a=a) for a in areas])\
-                  .then([[self.sql_A_value.format(y=y, i=i, a='{}') for y in years] for i in indexes])
+        self.chain.make([[[Cypher(self.sql_A_value, y=y, i=i, a=a) for y in years] for a in areas] for i in indexes])\
+                  .then([Cypher(self.sql_find_A_parent, a=a) for a in areas])\
+                  .then([[Cypher(self.sql_A_value, y=y, i=i, a=None) for y in years] for i in indexes])
 
     # 何时开始统计此项指标
     def trans_begin_stats(self, indexes):
-        self.chain.make([self.sql_find_begin_stats_Ys.format(i=i) for i in indexes])
+        self.chain.make([Cypher(self.sql_find_begin_stats_Ys, i=i) for i in indexes])
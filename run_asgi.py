@@ -0,0 +1,8 @@
+from const import DEBUG
+from web import create_asgi_app
+
+
+if __name__ == '__main__':
+    # 生产环境可使用：hypercorn web.asgi:app
+    app = create_asgi_app()
+    app.run(debug=DEBUG)
@@ -1,5 +1,89 @@
+import sys
+import json
+import time
+import argparse
+from collections import deque
+from contextlib import redirect_stdout
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
 from chatbot import CAChatBot
 
+
+def answer_one(chatbot: CAChatBot, line_no: int, question: str) -> dict:
+    """ 回答一个问题，返回一行JSONL记录；回答时出现异常则记录于error字段，不中断整个批次 """
+    start = time.perf_counter()
+    try:
+        detail = chatbot.query_detail(question)
+    except Exception as err:
+        detail = {'answer': chatbot.default_answer, 'question_types': [], 'charts': [],
+                  'error': f'{type(err).__name__}: {err}'}
+    return {'line': line_no, 'question': question, **detail,
+            'elapsed_ms': round((time.perf_counter() - start) * 1000, 3)}
+
+
+def read_questions(stream):
+    """ 逐行读取问题，跳过空行，返回(行号, 问题) """
+    for line_no, line in enumerate(stream, 1):
+        question = line.strip()
+        if question:
+            yield line_no, question
+
+
+def run_batch(chatbot: CAChatBot, questions, out, workers: int = 4, ordered: bool = True):
+    """ 以有界的线程池回答问题流，每完成一个即写出一行。
+        同时在处理中的问题不超过workers的两倍，内存占用与输入规模无关。
+    """
+    def write(record: dict):
+        out.write(json.dumps(record, ensure_ascii=False) + '\n')
+        out.flush()
+
+    window = workers * 2
+    with ThreadPoolExecutor(workers) as executor:
+        if ordered:
+            pending = deque()
+            for line_no, question in questions:
+                pending.append(executor.submit(answer_one, chatbot, line_no, question))
+                if len(pending) >= window:
+                    write(pending.popleft().result())
+            while pending:
+                write(pending.popleft().result())
+        else:
+            pending = set()
+            for line_no, question in questions:
+                pending.add(executor.submit(answer_one, chatbot, line_no, question))
+                if len(pending) >= window:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        write(future.result())
+            for future in wait(pending).done:
+                write(future.result())
+
+
+def main():
+    parser = argparse.ArgumentParser(description='小航：民航年报问答')
+    parser.add_argument('-i', '--input', help='批量模式：每行一个问题的文件，“-”为标准输入；缺省时进入对话模式')
+    parser.add_argument('-o', '--output', default='-', help='批量模式：JSONL回答的输出文件，默认为标准输出')
+    parser.add_argument('-w', '--workers', type=int, default=4, help='批量模式：并发回答的线程数')
+    parser.add_argument('--unordered', action='store_true', help='批量模式：按完成顺序而非输入顺序输出')
+    args = parser.parse_args()
+
+    if args.input is None:
+        CAChatBot(mode='cmd').run()
+        return
+
+    src = sys.stdin if args.input == '-' else open(args.input, encoding='utf-8')
+    out = sys.stdout if args.output == '-' else open(args.output, 'w', encoding='utf-8')
+    try:
+        # 调试信息与欢迎语改为输出到标准错误，避免混入JSONL
+        with redirect_stdout(sys.stderr):
+            chatbot = CAChatBot(mode='cmd')
+            run_batch(chatbot, read_questions(src), out, args.workers, not args.unordered)
+    finally:
+        if src is not sys.stdin:
+            src.close()
+        if out is not sys.stdout:
+            out.close()
+
+
 if __name__ == '__main__':
-    chatbot = CAChatBot(mode='cmd')
-    chatbot.run()
+    main()
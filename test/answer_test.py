@@ -2,13 +2,15 @@ import unittest
 import os
 
 from chatbot import CAChatBot
+from graph_backend import MemoryGraph
+from lib.cache import LRUCache
 
 os.chdir(os.path.join(os.getcwd(), '..'))
 
 
 class AnswerTest(unittest.TestCase):
 
-    bot = CAChatBot()
+    bot = CAChatBot(graph=MemoryGraph.load())
 
     def search(self, question: str):
         ans = self.bot.query(question)
@@ -300,6 +302,24 @@ class AnswerTest(unittest.TestCase):
         self.assertEqual(self.search('运输周转量数据统计出现在哪一年？'),
                          '指标“运输总周转量”最早于2011年开始统计。')
 
+    def test_query_many(self):
+        questions = ['2011年货邮周转量是多少？', '12年比11年多了哪些目录', '乱七八糟',
+                     '2011年港澳台运输总周转量占总体多少？', '15年形势怎样？']
+        bot = CAChatBot(graph=self.bot.searcher.graph)
+        self.assertEqual(bot.query_many(questions, batch_size=2), [self.search(q) for q in questions])
+
+    def test_query_many_prefetched(self):
+        # 查询结果缓存容纳不下一批的查询时，预取的结果仍不会被重复查询
+        graph = MemoryGraph.load()
+        executed = []
+        run_many = graph.run_many
+        graph.run_many = lambda sqls: executed.extend(sql.key for sql in sqls) or run_many(sqls)
+        bot = CAChatBot(graph=graph)
+        bot.searcher.query_cache = LRUCache(1)
+        questions = ['2011年货邮周转量是多少？', '2013年旅客周转量是多少？', '2012年运输总周转量是多少？']
+        self.assertEqual(bot.query_many(questions), [self.search(q) for q in questions])
+        self.assertEqual(len(executed), len(set(executed)))
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,45 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from lib.artifact import checksum, load_artifact, save_artifact
+from question_classifier import QuestionClassifier
+
+os.chdir(os.path.join(os.getcwd(), '..'))
+
+
+class ArtifactTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, 'classifier.pk')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_round_trip(self):
+        src = os.path.join(self.tmp_dir, 'words.txt')
+        with open(src, 'w', encoding='utf-8') as f:
+            f.write('a\n')
+        save_artifact(self.path, 1, checksum([src]), {'words': ['a']})
+        self.assertEqual(load_artifact(self.path, 1, checksum([src])), {'words': ['a']})
+        self.assertIsNone(load_artifact(self.path, 2, checksum([src])))  # 版本不符
+        with open(src, 'a', encoding='utf-8') as f:
+            f.write('b\n')
+        self.assertIsNone(load_artifact(self.path, 1, checksum([src])))  # 源文件变动
+        with open(self.path, 'wb') as f:
+            f.write(b'broken')
+        self.assertIsNone(load_artifact(self.path, 1, checksum([src])))  # 内容损坏
+
+    def test_classifier(self):
+        built = QuestionClassifier(artifact_path=self.path)
+        self.assertTrue(os.path.exists(self.path))
+        loaded = QuestionClassifier(artifact_path=self.path)
+        self.assertEqual(built.word_type_dict, loaded.word_type_dict)
+        question = '2011年货邮周转量是多少？'
+        self.assertEqual(built.classify(question).question_types, loaded.classify(question).question_types)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,34 @@
+import os
+import unittest
+
+from benchmark.corpus import load_corpus
+from benchmark.report import summarize, compare
+from benchmark.classifier import synthetic_words, synthetic_questions
+
+os.chdir(os.path.join(os.getcwd(), '..'))
+
+
+class BenchmarkTest(unittest.TestCase):
+
+    def test_corpus(self):
+        corpus = load_corpus()
+        self.assertIn('2011年总体情况怎样？', corpus)
+        self.assertIn('乱七八糟', corpus)  # questions列表中的问题
+        self.assertEqual(len(corpus), len(set(corpus)))
+
+    def test_compare(self):
+        baseline = {'sections': {'stage': {'graph': summarize([1.0] * 100)}}}
+        current = {'sections': {'stage': {'graph': summarize([1.0] * 90 + [2.0] * 10)}}}
+        self.assertEqual(compare(current, baseline), [('stage', 'graph', 'p95', 1.0, 2.0)])  # p99的尾部样本过少
+        self.assertEqual(compare(current, baseline, threshold=1.5), [])
+
+    def test_synthetic(self):
+        words = synthetic_words(100, '民航旅客运输量周转', seed=1)
+        self.assertEqual(len(set(words)), 100)
+        self.assertEqual(words, synthetic_words(100, '民航旅客运输量周转', seed=1))
+        questions = synthetic_questions(words, 64, n=10)
+        self.assertTrue(all(len(q) == 64 for q in questions))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+import os
+import time
+import unittest
+
+from chatbot import CAChatBot
+from graph_backend import MemoryGraph
+from lib.cache import LRUCache
+
+os.chdir(os.path.join(os.getcwd(), '..'))
+
+
+class LRUCacheTest(unittest.TestCase):
+
+    def test_lru(self):
+        cache = LRUCache(maxsize=2)
+        cache.put('a', 1)
+        cache.put('b', 2)
+        self.assertEqual(cache.get('a'), 1)
+        cache.put('c', 3)  # 淘汰最久未使用的b
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual((cache.get('a'), cache.get('c')), (1, 3))
+        self.assertEqual((cache.hits, cache.misses), (3, 1))
+        self.assertIsNone(cache.get('a', check=lambda v: v > 1))
+
+    def test_ttl_and_version(self):
+        cache = LRUCache(ttl=0.01)
+        cache.sync('v1')
+        cache.put('a', 1)
+        time.sleep(0.02)
+        self.assertIsNone(cache.get('a'))
+        cache.put('a', 1)
+        cache.sync('v1')
+        self.assertEqual(cache.get('a'), 1)
+        cache.sync('v2')
+        self.assertIsNone(cache.get('a'))
+
+
+class AnswerCacheTest(unittest.TestCase):
+
+    bot = CAChatBot(graph=MemoryGraph.load())
+
+    def test_answer_cache(self):
+        cache = self.bot.answer_cache
+        answer = self.bot.query('2011年货邮周转量是多少？')
+        hits = cache.hits
+        # 同义的问法命中缓存
+        self.assertEqual(self.bot.query('11年的货邮周转量为多少'), answer)
+        self.assertEqual(cache.hits, hits + 1)
+        # 重新构建后失效
+        self.bot.searcher.graph.set_version('rebuilt')
+        self.assertEqual(self.bot.query('2011年货邮周转量是多少？'), answer)
+        self.assertEqual(cache.hits, hits + 1)
+
+    def test_synonymous_compose(self):
+        # 同义的问法不得返回提及其他问题的回答
+        questions = ['2011年游客周转量的子集有？', '2011年游客周转量的组成？', '2011年游客周转量的子指标组成情况？']
+        for question in questions:
+            answer = self.bot.query(question)
+            for other in questions:
+                if other != question:
+                    self.assertNotIn(other, answer)
+
+    def test_query_cache(self):
+        cache = self.bot.searcher.query_cache
+        self.bot.query('2013年旅客周转量是多少？')
+        self.bot.answer_cache.clear()
+        hits = cache.hits
+        self.bot.query('2013年旅客周转量是多少？')
+        self.assertGreater(cache.hits, hits)
+
+
+if __name__ == '__main__':
+    unittest.main()
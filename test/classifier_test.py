@@ -1,6 +1,8 @@
 import os
 import unittest
 
+import Levenshtein
+
 from question_classifier import QuestionClassifier
 from lib.errors import QuestionError
 
@@ -243,6 +245,20 @@ class QCTest(unittest.TestCase):
         self.assertEqual(self.check_question('航空事故征候数据统计出现在哪一年？'), ['begin_stats'])
         self.assertEqual(self.check_question('运输周转量数据统计出现在哪一年？'), ['begin_stats'])
 
+    # 模糊匹配指标与逐词计算的结果一致
+    def test_index_matcher(self):
+        matcher = self.qc.index_matcher
+        for question in ['2011年旅客运输周转量是多少', '12年货邮运输量是多少', '13年民航飞机起降架次是多少',
+                         '14年港澳台航线运输周转量为多少', '15年通用航空作业时是多少']:
+            for threshold in (0.5, 0.7):
+                for result in matcher.pattern.findall(question):
+                    if len(result) < 4 or result in matcher.word_set:
+                        continue
+                    scores = [Levenshtein.ratio(word, result) for word in self.qc.index_wds]
+                    expected = (self.qc.index_wds[scores.index(max(scores))], result) \
+                        if max(scores) >= threshold else (None, None)
+                    self.assertEqual(matcher.match(result, 4, threshold), expected)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,71 @@
+import os
+import tempfile
+import unittest
+
+import answer_search
+from answer_search import AnswerSearcher
+from build_cakg import CivilAviationKnowledgeGraph
+from graph_backend import MemoryGraph, data_version
+from lib.cube import ValueCube
+
+os.chdir(os.path.join(os.getcwd(), '..'))
+
+
+class ValueCubeTest(unittest.TestCase):
+
+    cakg = CivilAviationKnowledgeGraph(MemoryGraph())
+    cakg.collect()
+    cube = ValueCube.from_rels(cakg.rels_values)
+
+    def test_series(self):
+        ys, units = self.cube.series(['2011', '2012', '2020'], '货邮周转量')
+        self.assertEqual(ys.tolist(), [173.91, 163.89, 0])
+        self.assertEqual(units, ['亿吨公里', '亿吨公里', ''])
+        ys, units = self.cube.series(['2011', '2012'], '运输总周转量', '港澳台')
+        self.assertEqual(ys.tolist(), [12.64, 13.66])
+        ys, units = self.cube.series(['2011'], '不存在的指标')
+        self.assertEqual((ys.tolist(), units), ([0], ['']))
+
+    def test_growth(self):
+        rates = self.cube.growth('2012', '2011', ['旅客周转量', '货邮周转量', '重大运输任务'])
+        self.assertEqual(round(float(rates[0]), 2), 10.63)
+        self.assertEqual(round(float(rates[1]), 2), -5.76)
+        self.assertTrue(rates[2] != rates[2])  # NaN
+
+    def test_record(self):
+        self.assertEqual(self.cube.record('2011', '货邮周转量').val(), '173.91亿吨公里')
+        self.assertEqual(self.cube.record('2011', '运输总周转量', '国际').repr, '航线')
+        self.assertFalse(self.cube.record('2011', '运输总周转量', '西部地区'))
+
+    def test_reload(self):
+        # 值立方的构建版本与图不同时由图回答，重新导出后载入新的值立方
+        graph = MemoryGraph()
+        graph.set_version('v1')
+        path = answer_search.CUBE_PATH
+        with tempfile.TemporaryDirectory() as tmp:
+            answer_search.CUBE_PATH = os.path.join(tmp, 'cube.pk')
+            try:
+                searcher = AnswerSearcher(graph)
+                self.assertIsNone(searcher.cube)
+                ValueCube.from_rels(self.cakg.rels_values, 'v1').save(answer_search.CUBE_PATH)
+                self.assertEqual(searcher.cube.version, 'v1')
+                graph.set_version('v2')
+                self.assertIsNone(searcher.cube)
+                ValueCube.from_rels(self.cakg.rels_values, 'v2').save(answer_search.CUBE_PATH)
+                self.assertEqual(searcher.cube.version, 'v2')
+                # 无法载入的文件同样由图回答
+                with open(answer_search.CUBE_PATH, 'wb') as f:
+                    f.write(b'broken')
+                self.assertIsNone(searcher.cube)
+            finally:
+                answer_search.CUBE_PATH = path
+
+    def test_data_version(self):
+        # 同一份数据构建的内存图与导出的值立方版本相同
+        version = MemoryGraph.load().version()
+        self.assertEqual(version, data_version(self.cakg.data_path))
+        self.assertEqual(MemoryGraph.load().version(), version)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,13 +1,14 @@
 import os
 import unittest
 
-from run_cmd import CAChatBot
+from run_cmd import CAChatBot, answer_one
+from graph_backend import MemoryGraph
 
 os.chdir(os.path.join(os.getcwd(), '..'))
 
 
 class QCErrTest(unittest.TestCase):
-    bot = CAChatBot()
+    bot = CAChatBot(graph=MemoryGraph.load())
 
     def query(self, question: str):
         return self.bot.query(question)
@@ -18,6 +19,13 @@ class QCErrTest(unittest.TestCase):
     def test_overstep_err(self):
         self.assertEqual(self.query('11年游客周转量同比增长？'), '年报中并未记录“2010”年的数据！')
 
+    def test_batch_err(self):
+        # 批量模式中回答出错的问题记录error字段
+        record = answer_one(self.bot, 1, '2011年12年的货邮周转量同去年相比变化了多少？')
+        self.assertEqual(record['answer'], self.bot.default_answer)
+        self.assertIn('error', record)
+        self.assertNotIn('error', answer_one(self.bot, 2, '2011年货邮周转量是多少？'))
+
 
 if __name__ == '__main__':
     unittest.main()
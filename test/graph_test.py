@@ -0,0 +1,111 @@
+import os
+import threading
+import unittest
+
+from graph_backend import MemoryGraph, Neo4jDriver
+from question_parser import QuestionParser
+from lib.chain import Cypher
+
+os.chdir(os.path.join(os.getcwd(), '..'))
+
+
+class MemoryGraphTest(unittest.TestCase):
+
+    graph = MemoryGraph.load()
+    qp = QuestionParser()
+
+    def run_sql(self, sql: str, **params):
+        return self.graph.run(Cypher(sql, **params))
+
+    def test_year_status(self):
+        self.assertEqual(self.run_sql(self.qp.sql_Y_status, y='2011'),
+                         [{'y.info': '全年航空安全形势稳定，旅客运输和通用航空保持较快增长，运行质量和经济效益得到提升，'
+                                     '基础设施建设取得新成绩，结构调整和深化改革迈出新步伐，党的建设和行业文化建设得到加强。'}])
+        self.assertEqual(self.run_sql(self.qp.sql_Y_status, y='2010'), [])
+
+    def test_value(self):
+        self.assertEqual(self.run_sql(self.qp.sql_I_value, y='2011', i='货邮周转量'),
+                         [{'r.value': '173.91', 'r.unit': '亿吨公里'}])
+        self.assertEqual(self.run_sql(self.qp.sql_A_value, y='2011', i='运输总周转量', a='国际'),
+                         [{'r.value': '196.84', 'r.unit': '亿吨公里', 'r.repr': '航线'}])
+        self.assertEqual(self.run_sql(self.qp.sql_I_value + ',r.child_id', y='2011', i='货邮周转量'),
+                         [{'r.value': '173.91', 'r.unit': '亿吨公里', 'r.child_id': '0'}])
+
+    def test_find(self):
+        self.assertEqual([r['n.name'] for r in self.run_sql(self.qp.sql_find_I_parent, i='货邮周转量')],
+                         ['运输总周转量'])
+        self.assertEqual([r['n.name'] for r in self.run_sql(self.qp.sql_find_A_parent, a='港澳台')], ['国内'])
+        self.assertIn({'y.name': '2011'}, self.run_sql(self.qp.sql_find_begin_stats_Ys, i='货邮周转量'))
+
+    def test_run_many(self):
+        sqls = [Cypher(self.qp.sql_I_value, y=y, i='货邮周转量') for y in ('2011', '2010', '2012')]
+        self.assertEqual([[r['r.value'] for r in rs] for rs in self.graph.run_many(sqls)],
+                         [['173.91'], [], ['163.89']])
+
+    def test_typed_relationship(self):
+        # 关系类型写入语句，占位的类型由前一链的结果填充
+        sql = Cypher(self.qp.sql_A_value, y='2011', i=None, a='国际').format('运输总周转量')
+        self.assertIn('[r:`运输总周转量`]', sql.query)
+        self.assertEqual(self.graph.run(sql), [{'r.value': '196.84', 'r.unit': '亿吨公里', 'r.repr': '航线'}])
+        self.assertIn('[r:`运输总周转量`]', Cypher.unwind([sql, sql]).query)
+
+    def test_rebuild(self):
+        from build_cakg import CivilAviationKnowledgeGraph
+
+        graph = MemoryGraph()
+        cakg = CivilAviationKnowledgeGraph(graph)
+        cakg.collect()
+        cakg.build()
+        edges = sum(len(v) for rels in graph._out.values() for v in rels.values())
+        cakg.build()  # 重复构建不产生重复的关系
+        self.assertEqual(sum(len(v) for rels in graph._out.values() for v in rels.values()), edges)
+        self.assertEqual(graph.run(Cypher(self.qp.sql_I_value, y='2011', i='货邮周转量')),
+                         [{'r.value': '173.91', 'r.unit': '亿吨公里'}])
+
+    def test_unsupported(self):
+        with self.assertRaises(ValueError):
+            self.run_sql('match (n) return n')
+
+
+class Neo4jDriverTest(unittest.TestCase):
+
+    class Graph:
+        """ 代替py2neo的Graph：查询等待started与release，记录连接池是否关闭 """
+
+        def __init__(self):
+            self.closed = False
+            self.started = threading.Event()
+            self.release = threading.Event()
+            self.service = self
+            self.connector = self
+
+        def close(self):
+            self.closed = True
+
+        def run(self, query, params=None):
+            self.started.set()
+            self.release.wait(5)
+            return self
+
+        def data(self):
+            return [{'1': 1}]
+
+    def test_reconnect_in_flight(self):
+        # 重新连接不关闭其他线程仍在使用的连接，其查询结束后才关闭
+        driver = Neo4jDriver(ping_interval=60)
+        driver._connect = self.Graph
+        old = driver.graph
+        thread = threading.Thread(target=driver.run, args=('return 1',))
+        thread.start()
+        old.started.wait(5)
+        driver.reconnect()
+        self.assertIsNot(driver.graph, old)
+        self.assertFalse(old.closed)
+        old.release.set()
+        thread.join(5)
+        self.assertTrue(old.closed)
+        self.assertFalse(driver.graph.closed)
+
+
+if __name__ == '__main__':
+    unittest.main()
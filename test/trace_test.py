@@ -0,0 +1,57 @@
+import os
+import json
+import tempfile
+import unittest
+
+from lib.chain import Cypher
+from lib.trace import Tracer, tracer
+from graph_backend import Neo4jGraph
+
+os.chdir(os.path.join(os.getcwd(), '..'))
+
+
+class TracerTest(unittest.TestCase):
+
+    def test_span_tree(self):
+        path = os.path.join(tempfile.mkdtemp(), 'trace.jsonl')
+        tracer = Tracer(path, buckets=(0.1, 1))
+        with tracer.span('query', question='q') as span:
+            with tracer.span('organize', labels={'qt': 'index_value'}):
+                pass
+            span.set(cached=False)
+        with open(path, encoding='utf-8') as f:
+            trace = json.loads(f.readline())
+        self.assertEqual(trace['attrs'], {'question': 'q', 'cached': False})
+        self.assertEqual([child['name'] for child in trace['children']], ['organize'])
+        self.assertEqual(trace['children'][0]['labels'], {'qt': 'index_value'})
+
+    def test_thread_children(self):
+        # 线程池中执行的各组查询挂在调用方的span下
+        class Driver:
+            def run(self, query, params):
+                if query.startswith('unwind'):
+                    return [{'_i': p['_i'], 'v': 1} for p in params['params']]
+                return [{'v': 1}]
+
+        graph = Neo4jGraph(Driver(), version_path=os.devnull, workers=2)
+        sqls = [Cypher('match (n) where n.name=$a return n', a=a) for a in 'xy'] + \
+               [Cypher('match (m) where m.name=$b return m', b='z')]
+        with tracer.span('graph') as span:
+            self.assertEqual(graph.run_many(sqls), [[{'v': 1}]] * 3)
+        groups = sorted((child.name, child.attrs['queries'], child.attrs['rows']) for child in span.children)
+        self.assertEqual(groups, [('graph_group', 1, 1), ('graph_group', 2, 2)])
+
+    def test_prometheus(self):
+        tracer = Tracer(None, buckets=(0.1, 1))
+        tracer.incr('questions_total', status='cached')
+        tracer.incr('questions_total', 2, status='cached')
+        tracer.observe('graph', 0.5)
+        text = tracer.prometheus()
+        self.assertIn('cakg_questions_total{status="cached"} 3', text)
+        self.assertIn('cakg_stage_seconds_bucket{stage="graph",le="0.1"} 0', text)
+        self.assertIn('cakg_stage_seconds_bucket{stage="graph",le="1.0"} 1', text)
+        self.assertIn('cakg_stage_seconds_count{stage="graph"} 1', text)
+
+
+if __name__ == '__main__':
+    unittest.main()
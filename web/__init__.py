@@ -1,10 +1,17 @@
 from flask import Flask
 
-from .main import main as main_blueprint
-
 
 def create_app():
+    from .main import main as main_blueprint
+
     app = Flask(__name__)
     app.register_blueprint(main_blueprint)
 
     return app
+
+
+def create_asgi_app():
+    """ 异步（ASGI）版本的web app，需要安装Quart """
+    from .asgi import app
+
+    return app
@@ -0,0 +1,65 @@
+# 异步的web app：同一进程以少量线程服务大量并发会话
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from quart import Quart, render_template, request, jsonify, abort, Response
+
+from chatbot import CAChatBot
+from lib.chart_store import make_chart_store
+from const import ASYNC_WORKERS, CHART_STORE_TTL
+
+app = Quart(__name__)
+chart_store = make_chart_store()  # 令牌: 各图表的配置，各请求互不影响
+# 分类与图查询在有界的线程池中执行，事件循环只负责收发请求
+executor = ThreadPoolExecutor(ASYNC_WORKERS, thread_name_prefix='chatbot')
+
+
+async def in_executor(func, *args):
+    return await asyncio.get_running_loop().run_in_executor(executor, func, *args)
+
+
+async def get_chatbot() -> CAChatBot:
+    """ 问答器在第一个请求时于线程池中创建，不阻塞事件循环 """
+    return await in_executor(CAChatBot.shared, 'web')
+
+
+@app.route('/')
+async def index():
+    return await render_template('index.html')
+
+
+@app.route('/send', methods=['GET', 'POST'])
+async def send_answer():
+    question = (await request.values).get('question')
+    chatbot = await get_chatbot()
+    answers = await chatbot.aquery(question, executor)
+    charts = []
+    if len(answers) == 2:
+        answers, charts = answers
+    token = await in_executor(chart_store.save, charts) if charts else None
+    return jsonify({'answer': answers, 'chart_token': token, 'chart_count': len(charts)})
+
+
+@app.route('/chart', methods=['GET', 'POST'])
+async def send_chart():
+    values = await request.values
+    token = values.get('chart_token', '')
+    charts = await in_executor(chart_store.get, token)
+    i = values.get('chart_index', type=int)
+    if charts is None or i is None or not 0 <= i < len(charts):
+        abort(404)
+    # 令牌由内容生成，可直接作为ETag，浏览器再次请求时返回304
+    etag = f'{token}-{i}'
+    if etag in request.if_none_match:
+        return Response('', status=304, headers={'ETag': f'"{etag}"'})
+    response = Response(charts[i], mimetype='application/json')
+    response.set_etag(etag)
+    response.cache_control.private = True
+    response.cache_control.max_age = CHART_STORE_TTL
+    return response
+
+
+@app.route('/metrics')
+async def metrics():
+    chatbot = await get_chatbot()
+    return Response(chatbot.metrics(), mimetype='text/plain; version=0.0.4')
@@ -1,10 +1,11 @@
-from flask import render_template, request, jsonify
+from flask import render_template, request, jsonify, abort, Response
 
 from . import main
 from chatbot import CAChatBot
+from lib.chart_store import make_chart_store
+from const import CHART_STORE_TTL
 
-chatbot = CAChatBot(mode='web')
-temp_charts = []
+chart_store = make_chart_store()  # 令牌: 各图表的配置，各请求互不影响
 
 
 @main.route('/')
@@ -14,20 +15,30 @@ def index():
 
 @main.route('/send', methods=['GET', 'POST'])
 def send_answer():
-    global temp_charts
-
     question = request.values.get('question')
-    answers = chatbot.query(question)
+    answers = CAChatBot.shared('web').query(question)
     charts = []
     if len(answers) == 2:
         answers, charts = answers
-    temp_charts = charts
-    return jsonify({'answer': answers, 'chart_count': len(charts)})
+    token = chart_store.save(charts) if charts else None  # web模式下charts为已序列化的图表配置
+    return jsonify({'answer': answers, 'chart_token': token, 'chart_count': len(charts)})
 
 
 @main.route('/chart', methods=['GET', 'POST'])
 def send_chart():
-    global temp_charts
-
-    i = int(request.values.get('chart_index'))
-    return temp_charts[i].dump_options()
+    token = request.values.get('chart_token', '')
+    charts = chart_store.get(token)
+    i = request.values.get('chart_index', type=int)
+    if charts is None or i is None or not 0 <= i < len(charts):
+        abort(404)
+    # 令牌由内容生成，可直接作为ETag，浏览器再次请求时返回304
+    response = Response(charts[i], mimetype='application/json')
+    response.set_etag(f'{token}-{i}')
+    response.cache_control.private = True
+    response.cache_control.max_age = CHART_STORE_TTL
+    return response.make_conditional(request)
+
+
+@main.route('/metrics')
+def metrics():
+    return Response(CAChatBot.shared('web').metrics(), mimetype='text/plain; version=0.0.4')
@@ -125,12 +125,12 @@ $(function () {
             chartElm.id = 'chart-' + inputCount + '-' + i;
             // add to output area
             outputArea.appendChild(chartElm);
-            get_chart(chartElm.id, i);
+            get_chart(chartElm.id, data['chart_token'], i);
         }
         stick_to_bottom();
     }
 
-    function get_chart(chart_id, chart_index) {
+    function get_chart(chart_id, chart_token, chart_index) {
         var chart = echarts.init(document.getElementById(chart_id), 'white', {renderer: 'canvas'});
         $.ajax({
             type: 'GET',
@@ -138,6 +138,7 @@ $(function () {
             dataType: 'json',
             contentType: 'application/json',
             data: {
+                'chart_token': chart_token,
                 'chart_index': chart_index,
             },
             success: function (result) {